@@ -36,6 +36,9 @@ fi
 
 # Run the agents
 echo "🚀 Starting agents..."
+if [ "$ENABLE_CHAT_PROTOCOL" != "1" ]; then
+    echo "ℹ️  Chat protocol disabled; export ENABLE_CHAT_PROTOCOL=1 to chat with the coordinator"
+fi
 echo ""
 python3 run_agents.py
 
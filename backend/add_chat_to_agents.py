@@ -3,8 +3,9 @@ Helper script to add chat protocol to all agents.
 Run this once to update all agent files with chat capabilities.
 """
 
-import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 AGENTS_DIR = "agents"
 
@@ -18,6 +19,16 @@ AGENTS_TO_UPDATE = [
     ("validation", "validation_agent")
 ]
 
+# Marker for files that already have the chat protocol wired in. It is
+# inserted right after the agents.config import, within the first few KB.
+CHAT_SENTINEL = "chat_protocol import"
+HEAD_PEEK_CHARS = 8192
+
+# Insertion points, compiled once at module load
+IMPORT_RE = re.compile(r'(from agents\.config import.*?\n)')
+AGENT_RE = re.compile(r'(agent = Agent\(\*\*config\))')
+MAIN_RE = re.compile(r'(\n\nif __name__ == "__main__":)')
+
 IMPORT_CODE = """from chat_protocol import AgentChatProtocol
 from chat_utils import format_agent_response, parse_user_query"""
 
@@ -54,63 +65,62 @@ agent.include(chat.get_protocol(), publish_manifest=True)
 
 def add_chat_to_agent(agent_key, agent_file_name):
     """Add chat protocol to a single agent file"""
-    file_path = os.path.join(AGENTS_DIR, f"{agent_file_name}.py")
+    file_path = Path(AGENTS_DIR) / f"{agent_file_name}.py"
 
-    if not os.path.exists(file_path):
+    if not file_path.exists():
         print(f"❌ File not found: {file_path}")
         return False
 
-    with open(file_path, 'r') as f:
-        content = f.read()
-
-    # Check if already has chat
-    if "chat_protocol import" in content:
-        print(f"✓ {agent_file_name} already has chat protocol")
-        return True
-
-    # 1. Add imports after existing imports
-    import_pattern = r'(from agents\.config import.*?\n)'
-    if re.search(import_pattern, content):
-        content = re.sub(
-            import_pattern,
-            r'\1' + IMPORT_CODE + '\n',
-            content,
-            count=1
-        )
-    else:
+    # Check if already has chat. The import sits near the top of the file,
+    # so peek at the head before paying for a full read on re-runs.
+    # Text mode keeps universal newlines, so the regexes below match CRLF files too.
+    with file_path.open('r', encoding='utf-8') as f:
+        head = f.read(HEAD_PEEK_CHARS)
+        if CHAT_SENTINEL in head:
+            print(f"✓ {agent_file_name} already has chat protocol")
+            return True
+        content = head + f.read()
+
+    # Locate all insertion points in a single scan of the original content,
+    # then splice the new code in with one join.
+    import_match = IMPORT_RE.search(content)
+    if not import_match:
         print(f"⚠️  Could not find import location in {agent_file_name}")
         return False
 
+    # 1. Add imports after existing imports
+    insertions = [(import_match.end(), IMPORT_CODE + '\n')]
+
     # 2. Add chat initialization after agent creation
-    agent_pattern = r'(agent = Agent\(\*\*config\))'
-    chat_init = CHAT_INIT_TEMPLATE.format(agent_key=agent_key)
-    if re.search(agent_pattern, content):
-        content = re.sub(
-            agent_pattern,
-            r'\1\n' + chat_init,
-            content,
-            count=1
-        )
+    agent_match = AGENT_RE.search(content)
+    if agent_match:
+        chat_init = CHAT_INIT_TEMPLATE.format(agent_key=agent_key)
+        insertions.append((agent_match.end(), '\n' + chat_init))
 
     # 3. Add chat handler before if __name__ == "__main__"
+    # (if no main block, add at end)
     agent_display = agent_file_name.replace('_', ' ').title()
     chat_handler = CHAT_HANDLER_TEMPLATE.format(agent_display=agent_display)
-
-    main_pattern = r'(\n\nif __name__ == "__main__":)'
-    if re.search(main_pattern, content):
-        content = re.sub(
-            main_pattern,
-            chat_handler + r'\1',
-            content,
-            count=1
-        )
+    main_match = MAIN_RE.search(content)
+    if main_match:
+        # Inserted as a re replacement template, as the earlier sub() did: its
+        # escapes (the \\n in the response text) are processed the same way
+        insertions.append((main_match.start(), main_match.expand(chat_handler)))
     else:
-        # If no main block, add at end
-        content += chat_handler
+        insertions.append((len(content), chat_handler))
+
+    insertions.sort(key=lambda item: item[0])
+    parts = []
+    last = 0
+    for offset, text in insertions:
+        parts.append(content[last:offset])
+        parts.append(text)
+        last = offset
+    parts.append(content[last:])
+    content = ''.join(parts)
 
     # Write back
-    with open(file_path, 'w') as f:
-        f.write(content)
+    file_path.write_text(content, encoding='utf-8')
 
     print(f"✓ Added chat protocol to {agent_file_name}")
     return True
@@ -121,10 +131,10 @@ def main():
     print("Adding Chat Protocol to All Agents")
     print("=" * 60)
 
-    success_count = 0
-    for agent_key, agent_file in AGENTS_TO_UPDATE:
-        if add_chat_to_agent(agent_key, agent_file):
-            success_count += 1
+    # Each agent file is independent, so rewrite them concurrently
+    with ThreadPoolExecutor(max_workers=len(AGENTS_TO_UPDATE)) as executor:
+        results = list(executor.map(lambda entry: add_chat_to_agent(*entry), AGENTS_TO_UPDATE))
+    success_count = sum(results)
 
     print("=" * 60)
     print(f"✓ Successfully updated {success_count}/{len(AGENTS_TO_UPDATE)} agents")
@@ -4,7 +4,8 @@ In production, these would be environment variables or service discovery.
 """
 
 import os
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, Mapping
 
 
 class AgentConfig:
@@ -34,65 +35,24 @@ class AgentConfig:
     # Base URLs for local development
     BASE_HOST = os.getenv("AGENT_HOST", "localhost")
 
+    # Fetch.AI chat protocol: the coordinator serves it and the other agents
+    # greet it only when ENABLE_CHAT_PROTOCOL=1; off by default
+    CHAT_PROTOCOL_ENABLED = os.getenv("ENABLE_CHAT_PROTOCOL", "0") == "1"
+
     @classmethod
     def get_endpoint(cls, port: int) -> str:
         """Generate endpoint URL for agent"""
-        return f"http://{cls.BASE_HOST}:{port}/submit"
+        endpoint = _ENDPOINTS.get(port)
+        if endpoint is None:
+            endpoint = f"http://{cls.BASE_HOST}:{port}/submit"
+        return endpoint
 
     @classmethod
     def get_agent_config(cls, agent_name: str) -> Dict[str, any]:
-        """Get configuration for a specific agent"""
-        configs = {
-            "coordinator": {
-                "name": "trial_coordinator",
-                "seed": cls.COORDINATOR_SEED,
-                "port": cls.COORDINATOR_PORT,
-                "endpoint": [cls.get_endpoint(cls.COORDINATOR_PORT)]
-            },
-            "eligibility": {
-                "name": "eligibility_agent",
-                "seed": cls.ELIGIBILITY_SEED,
-                "port": cls.ELIGIBILITY_PORT,
-                "endpoint": [cls.get_endpoint(cls.ELIGIBILITY_PORT)]
-            },
-            "pattern": {
-                "name": "pattern_agent",
-                "seed": cls.PATTERN_SEED,
-                "port": cls.PATTERN_PORT,
-                "endpoint": [cls.get_endpoint(cls.PATTERN_PORT)]
-            },
-            "discovery": {
-                "name": "discovery_agent",
-                "seed": cls.DISCOVERY_SEED,
-                "port": cls.DISCOVERY_PORT,
-                "endpoint": [cls.get_endpoint(cls.DISCOVERY_PORT)]
-            },
-            "matching": {
-                "name": "matching_agent",
-                "seed": cls.MATCHING_SEED,
-                "port": cls.MATCHING_PORT,
-                "endpoint": [cls.get_endpoint(cls.MATCHING_PORT)]
-            },
-            "site": {
-                "name": "site_agent",
-                "seed": cls.SITE_SEED,
-                "port": cls.SITE_PORT,
-                "endpoint": [cls.get_endpoint(cls.SITE_PORT)]
-            },
-            "prediction": {
-                "name": "prediction_agent",
-                "seed": cls.PREDICTION_SEED,
-                "port": cls.PREDICTION_PORT,
-                "endpoint": [cls.get_endpoint(cls.PREDICTION_PORT)]
-            },
-            "validation": {
-                "name": "validation_agent",
-                "seed": cls.VALIDATION_SEED,
-                "port": cls.VALIDATION_PORT,
-                "endpoint": [cls.get_endpoint(cls.VALIDATION_PORT)]
-            }
-        }
-        return configs.get(agent_name)
+        """Get configuration for a specific agent (a fresh copy the caller may modify)"""
+        entry = _AGENT_CONFIGS.get(agent_name)
+        # The values are strings/ints except the endpoint list, so a shallow copy plus that list suffices
+        return entry and {**entry, "endpoint": list(entry["endpoint"])}
 
     @classmethod
     def get_all_ports(cls) -> list[int]:
@@ -109,17 +69,84 @@ class AgentConfig:
         ]
 
 
+# Endpoints for the known agent ports; BASE_HOST is fixed at import time
+_ENDPOINTS: Dict[int, str] = {
+    port: f"http://{AgentConfig.BASE_HOST}:{port}/submit"
+    for port in AgentConfig.get_all_ports()
+}
+
+# Built once at import; get_agent_config() hands out copies, never these dicts
+_AGENT_CONFIGS: Dict[str, Dict[str, any]] = {
+    "coordinator": {
+        "name": "trial_coordinator",
+        "seed": AgentConfig.COORDINATOR_SEED,
+        "port": AgentConfig.COORDINATOR_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.COORDINATOR_PORT)]
+    },
+    "eligibility": {
+        "name": "eligibility_agent",
+        "seed": AgentConfig.ELIGIBILITY_SEED,
+        "port": AgentConfig.ELIGIBILITY_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.ELIGIBILITY_PORT)]
+    },
+    "pattern": {
+        "name": "pattern_agent",
+        "seed": AgentConfig.PATTERN_SEED,
+        "port": AgentConfig.PATTERN_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.PATTERN_PORT)]
+    },
+    "discovery": {
+        "name": "discovery_agent",
+        "seed": AgentConfig.DISCOVERY_SEED,
+        "port": AgentConfig.DISCOVERY_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.DISCOVERY_PORT)]
+    },
+    "matching": {
+        "name": "matching_agent",
+        "seed": AgentConfig.MATCHING_SEED,
+        "port": AgentConfig.MATCHING_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.MATCHING_PORT)]
+    },
+    "site": {
+        "name": "site_agent",
+        "seed": AgentConfig.SITE_SEED,
+        "port": AgentConfig.SITE_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.SITE_PORT)]
+    },
+    "prediction": {
+        "name": "prediction_agent",
+        "seed": AgentConfig.PREDICTION_SEED,
+        "port": AgentConfig.PREDICTION_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.PREDICTION_PORT)]
+    },
+    "validation": {
+        "name": "validation_agent",
+        "seed": AgentConfig.VALIDATION_SEED,
+        "port": AgentConfig.VALIDATION_PORT,
+        "endpoint": [AgentConfig.get_endpoint(AgentConfig.VALIDATION_PORT)]
+    }
+}
+
+
 class AgentRegistry:
     """
     Registry to store and retrieve agent addresses.
     In a real system, this would be replaced by Fetch.ai's Almanac contract.
     """
 
-    _addresses: Dict[str, str] = {}
+    _addresses: Mapping[str, str] = {}
+    _frozen = False
 
     @classmethod
     def register(cls, name: str, address: str):
-        """Register an agent's address"""
+        """
+        Register an agent's address. Once the registry is frozen, repeating an
+        existing registration is a no-op and anything else raises RuntimeError.
+        """
+        if cls._frozen:
+            if cls._addresses.get(name) == address:
+                return
+            raise RuntimeError(f"Cannot register '{name}': agent registry is frozen")
         cls._addresses[name] = address
         print(f"✓ Registered {name}: {address}")
 
@@ -132,14 +159,33 @@ class AgentRegistry:
         return address
 
     @classmethod
-    def all(cls) -> Dict[str, str]:
-        """Get all registered agents"""
+    def all(cls) -> Mapping[str, str]:
+        """Get all registered agents (read-only view once frozen, otherwise a copy)"""
+        if cls._frozen:
+            return cls._addresses
         return cls._addresses.copy()
 
+    @classmethod
+    def is_complete(cls) -> bool:
+        """Whether every configured agent (see AgentConfig.get_agent_config) has registered"""
+        return all(name in cls._addresses for name in _AGENT_CONFIGS)
+
+    @classmethod
+    def freeze(cls):
+        """Make the registry read-only once the registration phase is over"""
+        cls._addresses = MappingProxyType(dict(cls._addresses))
+        cls._frozen = True
+
+    @classmethod
+    def is_frozen(cls) -> bool:
+        """Whether the registration phase is over"""
+        return cls._frozen
+
     @classmethod
     def clear(cls):
         """Clear registry (for testing)"""
-        cls._addresses.clear()
+        cls._addresses = {}
+        cls._frozen = False
 
 
 # Timeout configurations
@@ -147,6 +193,14 @@ QUERY_TIMEOUT = 30.0  # seconds to wait for agent responses
 QUICK_TIMEOUT = 5.0   # seconds for health checks
 LONG_TIMEOUT = 60.0   # seconds for heavy processing
 
+# Candidate discovery
+DISCOVERY_MAX_RESULTS = 1000  # candidates the coordinator asks Discovery for
+
+
+def members_per_pattern(num_patterns: int, max_results: int = DISCOVERY_MAX_RESULTS) -> int:
+    """Most members Discovery takes from one pattern when `num_patterns` share `max_results`"""
+    return max(10, max_results // max(num_patterns, 1))
+
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -2,7 +2,7 @@
 Coordinator Agent: Orchestrates the entire multi-agent workflow.
 Responsibilities:
 - Receives queries with Conway-discovered patterns
-- Coordinates 6 specialized agents sequentially
+- Coordinates 6 specialized agents, overlapping steps without data dependencies
 - Aggregates results from all agents
 - Returns comprehensive matching results
 Flow:
@@ -13,10 +13,19 @@ from uagents import Agent, Context, Protocol
 import logging
 import time
 import asyncio
-from typing import Dict, Any, List
-from datetime import datetime
-from uuid import uuid4
-from anthropic import Anthropic
+import copy
+import hashlib
+import heapq
+import json
+import itertools
+import textwrap
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+from anthropic import AsyncAnthropic
+from cachetools import TTLCache
 import os
 from uagents_core.contrib.protocols.chat import (
     ChatMessage,
@@ -41,7 +50,7 @@ from agents.models import (
     EnrollmentForecast,
     AgentStatus
 )
-from agents.config import AgentConfig, AgentRegistry, QUERY_TIMEOUT
+from agents.config import AgentConfig, AgentRegistry, DISCOVERY_MAX_RESULTS, QUERY_TIMEOUT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -57,267 +66,687 @@ chat_proto = Protocol(spec=chat_protocol_spec)
 # Initialize Claude (Anthropic) client
 try:
     anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
-    llm_client = Anthropic(api_key=anthropic_api_key) if anthropic_api_key else None
+    llm_client = AsyncAnthropic(api_key=anthropic_api_key) if anthropic_api_key else None
 except Exception as e:
-    logger.warning(f"LLM initialization failed: {e}")
+    logger.warning("LLM initialization failed: %s", e)
     llm_client = None
 
 # Agent state
 agent_state = {
     "requests_processed": 0,
-    "start_time": time.time(),
+    "start_time": time.monotonic(),
     "conway_patterns": [],
     "patient_data": None,
-    "trial_data": None
+    "trial_data": None,
+    "addrs": None,  # AgentAddrs snapshot, see snapshot_agent_addresses()
+    "chat_worker": None,
+    "chat_dropped": 0
 }
 
+# Inbound chat messages, handled by chat_worker() off the query path
+chat_queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
+
+# Outgoing chat message ids: a random per-process prefix plus a counter, so
+# ids stay unique UUIDs without an os.urandom call per reply
+_msg_id_prefix = uuid4().bytes[:8]
+_msg_counter = itertools.count()
+
+# Trial criteria rarely change, so Eligibility and Pattern results are reused
+# across queries for the same trial. Locks make concurrent misses single-flight.
+_eligibility_cache = TTLCache(maxsize=1024, ttl=3600)
+_pattern_cache = TTLCache(maxsize=1024, ttl=600)
+# key -> [lock, users]; an entry is dropped once its last user finishes (see key_lock)
+_cache_locks: Dict[Any, list] = {}
+
+# Finished workflows, keyed by (trial_id, filters digest): dashboard refreshes
+# repeat identical queries within seconds. Only successful responses whose LLM
+# summary finished in time are stored.
+_response_cache = TTLCache(maxsize=512, ttl=60)
+
+# Claude summaries: the prompt depends only on the trial and its top-5 patterns
+_llm_cache = TTLCache(maxsize=256, ttl=600)
+
+# STEP 7 prompt, without the indentation an inline triple-quoted string would send as input tokens
+LLM_PROMPT_TEMPLATE = textwrap.dedent("""\
+    You are an AI clinical trial coordinator reviewing patient-trial matching data.
+    Trial ID: {trial_id}
+    Cluster summary: {cluster_summary}
+
+    Based on this data:
+    - Summarize which clusters look most promising for enrollment
+    - Identify potential exclusion risks
+    - Recommend an enrollment strategy
+
+    Keep it under 150 words, concise and professional.""")
+
+# Candidates per MatchingRequest; larger candidate lists are scored in parallel batches
+MATCHING_BATCH_SIZE = 250
+
+# Longest the final response waits on the LLM once all agent steps are done
+LLM_WAIT_TIMEOUT = 5.0
+
+# Serve the Fetch.AI chat protocol (ENABLE_CHAT_PROTOCOL=1); off by default
+CHAT_ENABLED = AgentConfig.CHAT_PROTOCOL_ENABLED
+
+# Cap on concurrent outbound agent calls across all in-flight queries
+MAX_INFLIGHT_SENDS = int(os.getenv("COORD_MAX_INFLIGHT", "6"))
+_send_semaphore = asyncio.Semaphore(MAX_INFLIGHT_SENDS)
+
+# Downstream agents orchestrated by handle_user_query
+DOWNSTREAM_AGENTS = ("eligibility", "pattern", "discovery", "matching", "site", "prediction")
+
+# Fixed set of keys reported in metadata["timing"]
+TIMING_KEYS = DOWNSTREAM_AGENTS + ("llm", "total")
+
+# Constant health-check fields
+AGENT_NAME = "coordinator_agent"
+STATUS_METADATA = {"agents_managed": len(DOWNSTREAM_AGENTS)}
+
+
+@dataclass(slots=True)
+class AgentAddrs:
+    """Resolved addresses of the downstream agents"""
+    eligibility: str
+    pattern: str
+    discovery: str
+    matching: str
+    site: str
+    prediction: str
+
+
+def snapshot_agent_addresses() -> AgentAddrs:
+    """Resolve downstream agent addresses from AgentRegistry (raises ValueError if any are missing)"""
+    addrs = AgentAddrs(**{name: AgentRegistry.get(name) for name in DOWNSTREAM_AGENTS})
+    agent_state["addrs"] = addrs
+    return addrs
+
+
+def finish_registration():
+    """
+    Snapshot the downstream addresses once they are registered, and freeze
+    AgentRegistry once every configured agent (validation included) has.
+
+    With one process per agent the other agents register in their own
+    process's registry, so this never freezes; that is fine, nothing else
+    registers here either.
+    """
+    try:
+        snapshot_agent_addresses()
+    except ValueError:
+        return
+    if AgentRegistry.is_complete():
+        AgentRegistry.freeze()
+
 
 @agent.on_event("startup")
 async def startup(ctx: Context):
     """Initialize coordinator on startup"""
-    logger.info("=" * 70)
-    logger.info("COORDINATOR AGENT STARTING")
-    logger.info("=" * 70)
-    logger.info(f"  Name: {agent.name}")
-    logger.info(f"  Address: {agent.address}")
-    logger.info(f"  Port: {config['port']}")
-    logger.info(f"  Endpoint: {config['endpoint']}")
-    logger.info("=" * 70)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("=" * 70)
+        logger.info("COORDINATOR AGENT STARTING")
+        logger.info("=" * 70)
+        logger.info("  Name: %s", agent.name)
+        logger.info("  Address: %s", agent.address)
+        logger.info("  Port: %s", config['port'])
+        logger.info("  Endpoint: %s", config['endpoint'])
+        logger.info("=" * 70)
     AgentRegistry.register("coordinator", agent.address)
+
+    # Agents started alongside us may not have registered yet; if so,
+    # check_registration retries and handle_user_query snapshots on first use.
+    finish_registration()
+
+    if CHAT_ENABLED:
+        agent_state["chat_worker"] = asyncio.create_task(chat_worker(ctx))
+
     ctx.logger.info("✓ Coordinator Agent ready to orchestrate!")
 
 
+@agent.on_interval(period=60.0)
+async def check_registration(ctx: Context):
+    """Retry finish_registration for agents that started after us"""
+    if not AgentRegistry.is_frozen():
+        finish_registration()
+
+
 @agent.on_query(model=UserQuery, replies={CoordinatorResponse})
 async def handle_user_query(ctx: Context, sender: str, msg: UserQuery) -> CoordinatorResponse:
     """
     Main entry point: Orchestrate full workflow across all agents,
     now enhanced with LLM reasoning using Claude.
     """
-    logger.info("=" * 70)
-    logger.info(f"COORDINATOR: Processing query for trial {msg.trial_id}")
-    logger.info(f"Query: {msg.query}")
-    logger.info("=" * 70)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("=" * 70)
+        logger.info("COORDINATOR: Processing query for trial %s", msg.trial_id)
+        logger.info("=" * 70)
+    logger.debug("Query: %s", msg.query)
+
+    workflow_start = time.perf_counter_ns()
+    response_key = (msg.trial_id, criteria_digest(msg.filters or {}))
+    cached = _response_cache.get(response_key)
+    if cached is not None:
+        agent_state["requests_processed"] += 1
+        return detached_response(
+            cached,
+            processing_time=elapsed(workflow_start),
+            metadata={**copy.deepcopy(cached.metadata), "query": msg.query, "cache": "hit"}
+        )
 
-    workflow_start = time.time()
-    metadata = {"query": msg.query, "agents_called": [], "timing": {}}
+    llm_task = None
+    timing = dict.fromkeys(TIMING_KEYS, 0.0)
+    # Clients show metadata["query"] (e.g. the dashboard's recent queries)
+    metadata = {"query": msg.query, "agents_called": [], "timing": timing}
 
     try:
         # Get agent addresses
-        eligibility_addr = AgentRegistry.get("eligibility")
-        pattern_addr = AgentRegistry.get("pattern")
-        discovery_addr = AgentRegistry.get("discovery")
-        matching_addr = AgentRegistry.get("matching")
-        site_addr = AgentRegistry.get("site")
-        prediction_addr = AgentRegistry.get("prediction")
+        addrs = agent_state["addrs"] or snapshot_agent_addresses()
 
         # ================================================================
         # STEP 1: Eligibility Agent
         # ================================================================
-        logger.info("STEP 1: Calling Eligibility Agent...")
-        step_start = time.time()
-        eligibility_response = await ctx.send(
-            eligibility_addr,
+        logger.debug("STEP %d: Calling %s Agent...", 1, "Eligibility")
+        step_start = time.perf_counter_ns()
+        eligibility_response = await send_cached(
+            ctx,
+            _eligibility_cache,
+            (msg.trial_id, criteria_digest(msg.filters.get("trial_data") or {})),
+            addrs.eligibility,
             EligibilityRequest(
                 trial_id=msg.trial_id,
                 trial_data=msg.filters.get("trial_data")
             ),
-            timeout=QUERY_TIMEOUT
+            is_cacheable=lambda r: "error" not in r.metadata
         )
-        metadata["timing"]["eligibility"] = time.time() - step_start
+        timing["eligibility"] = elapsed(step_start)
         metadata["agents_called"].append("eligibility")
 
+        # Serialize criteria once; reused by Pattern, Discovery and Matching.
+        # Downstream agents read optional fields with .get(), so None values are dropped.
+        eligibility_criteria = eligibility_response.dict(exclude_none=True) if eligibility_response else {}
+
         # ================================================================
         # STEP 2: Pattern Agent
         # ================================================================
-        logger.info("STEP 2: Calling Pattern Agent...")
-        step_start = time.time()
-        pattern_response = await ctx.send(
-            pattern_addr,
-            PatternRequest(
+        logger.debug("STEP %d: Calling %s Agent...", 2, "Pattern")
+        step_start = time.perf_counter_ns()
+        pattern_response = await send_cached(
+            ctx,
+            _pattern_cache,
+            (msg.trial_id, criteria_digest(eligibility_criteria)),
+            addrs.pattern,
+            # This and the later requests use Model.construct(): their payloads are the
+            # already-validated criteria/patterns/candidates from earlier responses, and
+            # re-validating them for every request (and every Matching batch) would copy them
+            PatternRequest.construct(
                 trial_id=msg.trial_id,
-                criteria=eligibility_response.dict() if eligibility_response else {},
+                criteria=eligibility_criteria,
                 min_pattern_size=50
             ),
-            timeout=QUERY_TIMEOUT
+            is_cacheable=lambda r: r.total_patterns > 0 and "error" not in r.conway_metadata
         )
-        metadata["timing"]["pattern"] = time.time() - step_start
+        timing["pattern"] = elapsed(step_start)
         metadata["agents_called"].append("pattern")
 
+        # No reply is an outage, not "no patterns": report it as an error
+        if pattern_response is None:
+            return empty_result(msg.trial_id, metadata, workflow_start, "pattern_unavailable", "error")
+        patterns = pattern_response.patterns
+
+        # No patterns → Discovery can't find candidates; skip the remaining agents
+        if not patterns:
+            return empty_result(msg.trial_id, metadata, workflow_start, "no_patterns")
+
+        # STEP 7 (LLM reasoning) only needs the patterns, so start it now and
+        # let it overlap with Discovery → Matching → Site → Prediction.
+        # This is a plain task rather than a TaskGroup child: it outlives several
+        # sequential steps and is awaited with its own timeout, so every exit
+        # path (early returns, the except branch, wait_for) cancels it explicitly.
+        llm_task = asyncio.create_task(timed(generate_llm_summary(msg.trial_id, patterns)))
+
         # ================================================================
         # STEP 3: Discovery Agent
         # ================================================================
-        logger.info("STEP 3: Calling Discovery Agent...")
-        step_start = time.time()
-        discovery_response = await ctx.send(
-            discovery_addr,
-            DiscoveryRequest(
+        logger.debug("STEP %d: Calling %s Agent...", 3, "Discovery")
+        step_start = time.perf_counter_ns()
+        discovery_response = await bounded_send(
+            ctx,
+            addrs.discovery,
+            DiscoveryRequest.construct(
                 trial_id=msg.trial_id,
-                patterns=pattern_response.patterns if pattern_response else [],
-                eligibility_criteria=eligibility_response.dict() if eligibility_response else {},
-                max_results=1000
+                # Discovery only selects members; centroids stay with Matching
+                patterns=[
+                    {
+                        "pattern_id": p.get("pattern_id"),
+                        "size": p.get("size", 0),
+                        "member_ids": p.get("member_ids", [])
+                    }
+                    for p in patterns
+                ],
+                eligibility_criteria=eligibility_criteria,
+                max_results=DISCOVERY_MAX_RESULTS
             ),
             timeout=QUERY_TIMEOUT
         )
-        metadata["timing"]["discovery"] = time.time() - step_start
+        timing["discovery"] = elapsed(step_start)
         metadata["agents_called"].append("discovery")
 
+        if discovery_response is None:
+            llm_task.cancel()
+            return empty_result(msg.trial_id, metadata, workflow_start, "discovery_unavailable", "error")
+        if not discovery_response.candidates:
+            llm_task.cancel()
+            return empty_result(msg.trial_id, metadata, workflow_start, "no_candidates")
+
         # ================================================================
         # STEP 4: Matching Agent
         # ================================================================
-        logger.info("STEP 4: Calling Matching Agent...")
-        step_start = time.time()
-        matching_response = await ctx.send(
-            matching_addr,
-            MatchingRequest(
-                trial_id=msg.trial_id,
-                candidates=discovery_response.candidates if discovery_response else [],
-                eligibility_criteria=eligibility_response.dict() if eligibility_response else {},
-                patterns=pattern_response.patterns if pattern_response else []
-            ),
-            timeout=QUERY_TIMEOUT
+        logger.debug("STEP %d: Calling %s Agent...", 4, "Matching")
+        step_start = time.perf_counter_ns()
+        matches, total_scored, failed_batches = await score_in_batches(
+            ctx,
+            addrs.matching,
+            msg.trial_id,
+            discovery_response.candidates,
+            eligibility_criteria,
+            patterns
         )
-        metadata["timing"]["matching"] = time.time() - step_start
+        timing["matching"] = elapsed(step_start)
         metadata["agents_called"].append("matching")
+        if failed_batches:
+            # Those candidates are missing from matches; report them instead of a clean success
+            logger.warning("%d of the Matching batches for %s got no reply", failed_batches, msg.trial_id)
+            metadata["failed_matching_batches"] = failed_batches
+
+        if not matches:
+            llm_task.cancel()
+            # Every batch failing is an outage, not an empty result
+            status = "error" if failed_batches else "success"
+            return empty_result(msg.trial_id, metadata, workflow_start, "no_matches", status)
 
         # ================================================================
         # STEP 5: Site Agent
         # ================================================================
-        logger.info("STEP 5: Calling Site Agent...")
-        step_start = time.time()
-        site_response = await ctx.send(
-            site_addr,
-            SiteRequest(
+        logger.debug("STEP %d: Calling %s Agent...", 5, "Site")
+        step_start = time.perf_counter_ns()
+        site_response = await bounded_send(
+            ctx,
+            addrs.site,
+            SiteRequest.construct(
                 trial_id=msg.trial_id,
-                matches=matching_response.matches if matching_response else [],
+                matches=matches,
                 max_sites=10
             ),
-            timeout=QUERY_TIMEOUT
+            timeout=QUERY_TIMEOUT,
+            default=empty_site_response(msg.trial_id)
         )
-        metadata["timing"]["site"] = time.time() - step_start
+        timing["site"] = elapsed(step_start)
         metadata["agents_called"].append("site")
+        sites = site_response.recommended_sites
 
         # ================================================================
         # STEP 6: Prediction Agent
         # ================================================================
-        logger.info("STEP 6: Calling Prediction Agent...")
-        step_start = time.time()
-        prediction_response = await ctx.send(
-            prediction_addr,
-            PredictionRequest(
+        logger.debug("STEP %d: Calling %s Agent...", 6, "Prediction")
+        step_start = time.perf_counter_ns()
+        prediction_response = await bounded_send(
+            ctx,
+            addrs.prediction,
+            PredictionRequest.construct(
                 trial_id=msg.trial_id,
-                target_enrollment=msg.filters.get("target_enrollment", 300),
-                matches=matching_response.matches if matching_response else [],
-                patterns=pattern_response.patterns if pattern_response else [],
-                sites=site_response.recommended_sites if site_response else []
+                target_enrollment=int(msg.filters.get("target_enrollment", 300)),
+                **prediction_inputs(matches, patterns, sites)
             ),
             timeout=QUERY_TIMEOUT
         )
-        metadata["timing"]["prediction"] = time.time() - step_start
+        timing["prediction"] = elapsed(step_start)
         metadata["agents_called"].append("prediction")
 
-        # ================================================================
-        # STEP 7: NEW — LLM Reasoning with Claude
-        # ================================================================
-        llm_summary = None
-        if llm_client:
-            try:
-                logger.info("STEP 7: Generating LLM reasoning with Claude...")
-                cluster_summary = ", ".join(
-                    [f"{p.get('pattern_id', i)} ({p.get('size', 0)} patients)" for i, p in enumerate(pattern_response.patterns[:5])]
-                )
-                prompt = f"""
-                You are an AI clinical trial coordinator reviewing patient-trial matching data.
-                Trial ID: {msg.trial_id}
-                Cluster summary: {cluster_summary}
-
-                Based on this data:
-                - Summarize which clusters look most promising for enrollment
-                - Identify potential exclusion risks
-                - Recommend an enrollment strategy
-
-                Keep it under 150 words, concise and professional.
-                """
-                response = llm_client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=400,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                llm_summary = response.content[0].text.strip()
-                logger.info(f"[LLM Reasoning Output]: {llm_summary}")
-            except Exception as e:
-                logger.warning(f"LLM reasoning step failed: {e}")
+        # STEP 7 result (usually finished by now); never hold the response for long
+        llm_finished = True
+        try:
+            llm_summary, timing["llm"] = await asyncio.wait_for(llm_task, timeout=LLM_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("LLM reasoning still running after agent steps; responding without it")
+            llm_summary = None
+            llm_finished = False
 
         # ================================================================
         # Aggregate Results
         # ================================================================
-        total_time = time.time() - workflow_start
-        metadata["timing"]["total"] = total_time
+        total_time = elapsed(workflow_start)
+        timing["total"] = total_time
+        logger.info("COORDINATOR: trial %s done in %.2fs (%d matches, %d sites)",
+                    msg.trial_id, total_time, total_scored, len(sites))
 
         agent_state["requests_processed"] += 1
 
-        return CoordinatorResponse(
+        # Every field comes from already-validated agent responses, so skip re-validation
+        response = CoordinatorResponse.construct(
             trial_id=msg.trial_id,
-            status="success",
-            eligible_patients=matching_response.matches if matching_response else [],
-            total_matches=matching_response.total_scored if matching_response else 0,
-            recommended_sites=site_response.recommended_sites if site_response else [],
+            status="partial" if failed_batches else "success",
+            eligible_patients=matches,
+            total_matches=total_scored,
+            recommended_sites=sites,
             enrollment_forecast=prediction_response.dict() if prediction_response else {},
             processing_time=total_time,
             metadata={**metadata, "llm_summary": llm_summary or "No reasoning generated"}
         )
+        # A timed-out summary or lost batch would be missing from every hit, so only
+        # cache complete responses, with containers of their own (see detached_response)
+        if llm_finished and not failed_batches:
+            _response_cache[response_key] = detached_response(response)
+        return response
 
     except Exception as e:
-        logger.error(f"Error in coordinator workflow: {e}", exc_info=True)
-        return CoordinatorResponse(
+        logger.error("Error in coordinator workflow: %s", e, exc_info=True)
+        if llm_task is not None:
+            llm_task.cancel()
+        # construct() neither validates nor copies, so the empty containers are built here
+        return CoordinatorResponse.construct(
             trial_id=msg.trial_id,
             status="error",
             eligible_patients=[],
             total_matches=0,
             recommended_sites=[],
             enrollment_forecast={},
-            processing_time=time.time() - workflow_start,
+            processing_time=elapsed(workflow_start),
             metadata={"error": str(e), "agents_called": metadata["agents_called"]}
         )
 
 
+def empty_site_response(trial_id: str) -> SiteResponse:
+    """Stand-in for a Site Agent that did not answer, so the workflow can read its fields unconditionally"""
+    return SiteResponse(trial_id=trial_id, recommended_sites=[], total_sites=0, coverage_percentage=0.0)
+
+
+def empty_result(
+    trial_id: str,
+    metadata: Dict[str, Any],
+    workflow_start: int,
+    reason: str,
+    status: str = "success"
+) -> CoordinatorResponse:
+    """Response for a workflow cut short because a step had nothing to pass on (or didn't answer)"""
+    total_time = elapsed(workflow_start)
+    metadata["timing"]["total"] = total_time
+    agent_state["requests_processed"] += 1
+    logger.info("Workflow for %s ended early: %s", trial_id, reason)
+    return CoordinatorResponse.construct(
+        trial_id=trial_id,
+        status=status,
+        eligible_patients=[],
+        total_matches=0,
+        recommended_sites=[],
+        enrollment_forecast={},
+        processing_time=total_time,
+        metadata={**metadata, "short_circuit": reason}
+    )
+
+
+async def bounded_send(ctx: Context, destination: str, message, timeout: float = QUERY_TIMEOUT, default=None):
+    """ctx.send gated by the coordinator-wide in-flight semaphore; `default` replaces a missing reply"""
+    async with _send_semaphore:
+        response = await ctx.send(destination, message, timeout=timeout)
+    return default if response is None else response
+
+
+async def timed(coro) -> tuple:
+    """
+    Await `coro` and return (result, its own wall time in seconds), for overlapped
+    branches. The caller records the time only once it has the result, so a
+    cancelled or abandoned branch never writes into an already-returned response.
+    """
+    start = time.perf_counter_ns()
+    result = await coro
+    return result, elapsed(start)
+
+
+def detached_response(response: CoordinatorResponse, **update) -> CoordinatorResponse:
+    """
+    Copy of a coordinator response for the response cache, in either direction.
+
+    The patient/site lists, forecast and metadata are the copy's own, so adding,
+    dropping or reordering entries never reaches the cached response. The
+    patient and site dicts inside the lists are still shared: treat them as
+    read-only.
+    """
+    fields = {
+        "eligible_patients": list(response.eligible_patients),
+        "recommended_sites": list(response.recommended_sites),
+        "enrollment_forecast": copy.deepcopy(response.enrollment_forecast),
+    }
+    fields.update(update)
+    if "metadata" not in update:
+        fields["metadata"] = copy.deepcopy(response.metadata)
+    return response.copy(update=fields)
+
+
+def criteria_digest(criteria: Dict[str, Any]) -> bytes:
+    """Stable hash of a criteria (or filters) dict, for use in cache keys"""
+    encoded = json.dumps(criteria, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def elapsed(start_ns: int) -> float:
+    """Seconds since a time.perf_counter_ns() reading"""
+    return (time.perf_counter_ns() - start_ns) / 1e9
+
+
+@asynccontextmanager
+async def key_lock(key: Any):
+    """Hold the lock for `key`, creating it on first use and removing it when no one else needs it"""
+    entry = _cache_locks.get(key)
+    if entry is None:
+        entry = _cache_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _cache_locks[key]
+
+
+async def send_cached(
+    ctx: Context,
+    cache: TTLCache,
+    key: Any,
+    destination: str,
+    message,
+    is_cacheable: Callable[[Any], bool]
+):
+    """bounded_send that serves repeat requests for `key` from `cache` (None if the agent didn't reply)"""
+    async with key_lock(key):
+        response = cache.get(key)
+        if response is None:
+            response = await bounded_send(ctx, destination, message, timeout=QUERY_TIMEOUT)
+            if response is not None and is_cacheable(response):
+                cache[key] = response
+        return response
+
+
+async def score_in_batches(
+    ctx: Context,
+    matching_addr: str,
+    trial_id: str,
+    candidates: List[Dict[str, Any]],
+    eligibility_criteria: Dict[str, Any],
+    patterns: List[Dict[str, Any]]
+) -> tuple[List[Dict[str, Any]], int, int]:
+    """
+    STEP 4 helper: split candidates into MATCHING_BATCH_SIZE chunks, score them
+    concurrently and merge the (already sorted) batches by overall_score.
+    Returns (matches, total_scored, number of batches that got no reply).
+    """
+    # Every batch carries the patterns, so send only what scoring reads
+    # (Discovery's member_ids would otherwise be repeated per batch)
+    scoring_patterns = [
+        {
+            "pattern_id": p.get("pattern_id"),
+            "centroid": p.get("centroid", []),
+            "enrollment_success_rate": p.get("enrollment_success_rate", 0.75)
+        }
+        for p in patterns
+    ]
+
+    batches = [
+        candidates[i:i + MATCHING_BATCH_SIZE]
+        for i in range(0, len(candidates), MATCHING_BATCH_SIZE)
+    ]
+
+    responses = await asyncio.gather(*[
+        bounded_send(
+            ctx,
+            matching_addr,
+            MatchingRequest.construct(
+                trial_id=trial_id,
+                candidates=batch,
+                eligibility_criteria=eligibility_criteria,
+                patterns=scoring_patterns
+            ),
+            timeout=QUERY_TIMEOUT
+        )
+        for batch in batches
+    ])
+    replies = [r for r in responses if r is not None]
+    failed_batches = len(responses) - len(replies)
+
+    if len(replies) == 1:
+        return replies[0].matches, replies[0].total_scored, failed_batches
+
+    matches = list(heapq.merge(
+        *(r.matches for r in replies),
+        key=lambda m: m.get("overall_score", 0),
+        reverse=True
+    ))
+    return matches, sum(r.total_scored for r in replies), failed_batches
+
+
+def prediction_inputs(
+    matches: List[Dict[str, Any]],
+    patterns: List[Dict[str, Any]],
+    sites: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    STEP 6 payload trimmed to what the Prediction Agent's forecast reads:
+    each match's overall_score, each pattern's enrollment_success_rate and
+    the number of sites. Matches and patterns have already been sent in full
+    to Site/Discovery/Matching, so this avoids shipping them a second time.
+    """
+    return {
+        "matches": [{"overall_score": m.get("overall_score", 0)} for m in matches],
+        "patterns": [
+            {"pattern_id": p.get("pattern_id"), "enrollment_success_rate": p.get("enrollment_success_rate", 0.75)}
+            for p in patterns
+        ],
+        "sites": [{"site_id": site.get("site_id")} for site in sites]
+    }
+
+
+def llm_cache_key(trial_id: str, patterns: List[Dict[str, Any]]) -> tuple:
+    """Everything the STEP 7 prompt is built from, as a hashable key"""
+    return trial_id, tuple((p.get("pattern_id", i), p.get("size", 0)) for i, p in enumerate(patterns[:5]))
+
+
+async def generate_llm_summary(trial_id: str, patterns: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    STEP 7: LLM reasoning with Claude over the top discovered patterns.
+    Uses the async SDK so the request yields the event loop while it overlaps with agent calls.
+    """
+    if not llm_client:
+        return None
+
+    key = llm_cache_key(trial_id, patterns)
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        logger.debug("STEP 7: Generating LLM reasoning with Claude...")
+        # The cache key already holds the top-5 (pattern_id, size) pairs
+        cluster_summary = ", ".join(f"{pattern_id} ({size} patients)" for pattern_id, size in key[1])
+        prompt = LLM_PROMPT_TEMPLATE.format(trial_id=trial_id, cluster_summary=cluster_summary)
+        response = await llm_client.messages.create(
+            model="claude-3-haiku-20240307",
+            max_tokens=400,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        llm_summary = response.content[0].text.strip()
+        logger.debug("[LLM Reasoning Output]: %s", llm_summary)
+        _llm_cache[key] = llm_summary
+        return llm_summary
+    except Exception as e:
+        logger.warning("LLM reasoning step failed: %s", e)
+        return None
+
+
 @agent.on_query(model=AgentStatus, replies={AgentStatus})
 async def handle_status(ctx: Context, sender: str, msg: AgentStatus) -> AgentStatus:
     """Health check endpoint"""
-    uptime = time.time() - agent_state["start_time"]
     return AgentStatus(
-        agent_name="coordinator_agent",
+        agent_name=AGENT_NAME,
         status="healthy",
         address=agent.address,
-        uptime=uptime,
+        uptime=time.monotonic() - agent_state["start_time"],
         requests_processed=agent_state["requests_processed"],
-        metadata={"agents_managed": 6}
+        metadata=STATUS_METADATA
     )
 
 
 # Chat protocol
 @chat_proto.on_message(ChatMessage)
 async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
-    ctx.logger.info(f"Received chat message from {sender}")
-    ack = ChatAcknowledgement(timestamp=datetime.utcnow(), acknowledged_msg_id=msg.msg_id)
-    await ctx.send(sender, ack)
+    """Queue the message for chat_worker and return immediately"""
+    try:
+        chat_queue.put_nowait((sender, msg))
+    except asyncio.QueueFull:
+        agent_state["chat_dropped"] += 1
+        logger.warning("Chat queue full, dropping message from %s", sender)
+
+
+async def chat_worker(ctx: Context):
+    """Drain chat_queue so chat traffic never runs inline with query orchestration"""
+    while True:
+        sender, msg = await chat_queue.get()
+        try:
+            await reply_to_chat(ctx, sender, msg)
+        except Exception as e:
+            logger.error("Error replying to chat message from %s: %s", sender, e)
+        finally:
+            chat_queue.task_done()
+
+
+def next_msg_id() -> UUID:
+    """Cheap unique id for an outgoing ChatMessage"""
+    return UUID(bytes=_msg_id_prefix + next(_msg_counter).to_bytes(8, "big"))
+
+
+async def reply_to_chat(ctx: Context, sender: str, msg: ChatMessage):
+    """Acknowledge a chat message and echo its text items back in a single reply"""
+    ctx.logger.info("Received chat message from %s", sender)
+    now = datetime.now(timezone.utc)
+    ack = ChatAcknowledgement(timestamp=now, acknowledged_msg_id=msg.msg_id)
+    reply_contents = []
     for item in msg.content:
         if isinstance(item, TextContent):
-            ctx.logger.info(f"Message content: {item.text}")
-            response = ChatMessage(
-                timestamp=datetime.utcnow(),
-                msg_id=uuid4(),
-                content=[TextContent(type="text", text=f"Coordinator Agent received your message: {item.text}")]
+            ctx.logger.info("Message content: %s", item.text)
+            reply_contents.append(
+                TextContent(type="text", text=f"Coordinator Agent received your message: {item.text}")
             )
-            await ctx.send(sender, response)
+    await ctx.send(sender, ack)
+    if reply_contents:
+        await ctx.send(sender, ChatMessage(timestamp=now, msg_id=next_msg_id(), content=reply_contents))
 
 
 @chat_proto.on_message(ChatAcknowledgement)
 async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledgement):
-    ctx.logger.info(f"Received acknowledgement from {sender} for message: {msg.acknowledged_msg_id}")
+    ctx.logger.info("Received acknowledgement from %s for message: %s", sender, msg.acknowledged_msg_id)
 
 
-# Include the chat protocol
-agent.include(chat_proto, publish_manifest=True)
+# Clients query through on_query; peer chat is opt-in
+if CHAT_ENABLED:
+    agent.include(chat_proto, publish_manifest=True)
 
 if __name__ == "__main__":
     logger.info("Starting Coordinator Agent...")
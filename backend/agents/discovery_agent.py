@@ -5,7 +5,7 @@ Responsibilities:
 - Receives matching patterns from Pattern Agent
 - Searches patient database for patients in those patterns
 - Filters by basic eligibility criteria
-- Returns list of patient candidates with embeddings
+- Returns list of patient candidates tagged with their pattern
 
 Uses Pattern Discovery's discovered patterns to efficiently find relevant patients.
 """
@@ -13,13 +13,16 @@ Uses Pattern Discovery's discovered patterns to efficiently find relevant patien
 from uagents import Agent, Context, Protocol
 import logging
 import time
+import asyncio
 import numpy as np
+import pandas as pd
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -30,11 +33,10 @@ from uagents_core.contrib.protocols.chat import (
 )
 
 from agents.models import DiscoveryRequest, DiscoveryResponse, AgentStatus
-from agents.config import AgentConfig, AgentRegistry
+from agents.config import AgentConfig, AgentRegistry, members_per_pattern
+from agents.startup import connect_to_coordinator
 from data_loader import ClinicalDataLoader
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -53,9 +55,12 @@ agent_state = {
     "start_time": time.time(),
     "data_loader": None,
     "patient_cache": None,
+    "patient_index": None,
+    "warmup_task": None,
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -64,64 +69,43 @@ async def startup(ctx: Context):
     logger.info(f"✓ Discovery Agent started: {ctx.agent.address}")
     AgentRegistry.register("discovery", ctx.agent.address)
     agent_state["data_loader"] = ClinicalDataLoader()
+    agent_state["warmup_task"] = asyncio.create_task(load_patient_cache())
+    agent_state["warmup_task"].add_done_callback(log_warmup_failure)
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Discovery Agent! Ready to search patient database for matching candidates."
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Discovery Agent! Ready to search patient database for matching candidates."
+    )
 
 
 @agent.on_message(model=DiscoveryRequest)
 async def handle_discovery_request(ctx: Context, sender: str, msg: DiscoveryRequest):
     """Discover patient candidates using patient patterns"""
-    logger.info(f"  → Discovery Agent searching patients for: {msg.trial_id}")
+    logger.debug("  → Discovery Agent searching patients for: %s", msg.trial_id)
 
     try:
-        # Load patient data if not cached
+        # Patient data is loaded in the background from startup; wait for it
+        # (or retry, if that load failed) on the first requests
         if agent_state["patient_cache"] is None:
-            data_loader = agent_state["data_loader"]
-            data = data_loader.prepare_for_conway()
-            agent_state["patient_cache"] = data["patients"]
+            warmup = agent_state["warmup_task"]
+            if warmup is None or warmup.done():
+                warmup = agent_state["warmup_task"] = asyncio.create_task(load_patient_cache())
+            await warmup
 
         patients = agent_state["patient_cache"]
         criteria = msg.eligibility_criteria
         patterns = msg.patterns
 
         # Find candidates matching patterns
-        candidates = discover_candidates(patients, patterns, criteria, msg.max_results)
+        candidates = discover_candidates(patients, patterns, criteria, msg.max_results, agent_state["patient_index"])
 
         agent_state["requests_processed"] += 1
-        logger.info(f"  ✓ Discovered {len(candidates)} patient candidates from {len(patients)} total")
+        logger.info("  ✓ Discovered %d patient candidates from %d total", len(candidates), len(patients))
 
         await ctx.send(sender, DiscoveryResponse(
             trial_id=msg.trial_id,
-            candidates=candidates,
+            candidates=[candidate.to_wire() for candidate in candidates],
             total_found=len(candidates),
             search_metadata={
                 "total_patients_searched": len(patients),
@@ -140,7 +124,161 @@ async def handle_discovery_request(ctx: Context, sender: str, msg: DiscoveryRequ
         ))
 
 
-def discover_candidates(patients: list, patterns: list, criteria: dict, max_results: int) -> list:
+async def load_patient_cache():
+    """Load patients and their filter index off the event loop"""
+    data = await asyncio.to_thread(agent_state["data_loader"].prepare_for_conway)
+    patients = data["patients"]
+    agent_state["patient_index"] = await asyncio.to_thread(build_patient_index, patients)
+    agent_state["patient_cache"] = patients
+    logger.info(f"  ✓ Loaded {len(patients)} patients")
+
+
+def log_warmup_failure(task: asyncio.Task):
+    """Log a failed startup load; the next request retries it without awaiting this task"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Failed to preload patient data: {task.exception()}")
+
+
+def build_patient_index(patients: list) -> dict:
+    """
+    Lookup structures over the cached patient list for vectorized filtering.
+
+    gender and primary_condition are factorized into integer codes (the vocab
+    lists map a code back to its value, conditions also kept lowercased), and
+    patient positions are bucketed by (condition code, gender code) so a
+    request only touches the buckets its criteria allow. row_by_id maps a
+    patient_id to its position, for resolving pattern membership.
+    """
+    gender_codes, gender_vocab = pd.factorize(pd.Series([p.get("gender") for p in patients], dtype=object))
+    condition_codes, condition_vocab = pd.factorize(
+        pd.Series([p.get("primary_condition", "") for p in patients], dtype=object)
+    )
+    buckets = pd.DataFrame({"condition": condition_codes, "gender": gender_codes}).groupby(
+        ["condition", "gender"]
+    ).indices
+    return {
+        "age": np.fromiter((p.get("age", 0) for p in patients), dtype=np.float32, count=len(patients)),
+        "buckets": {(int(c), int(g)): rows.astype(np.int32) for (c, g), rows in buckets.items()},
+        "gender_vocab": list(gender_vocab),
+        "condition_vocab": list(condition_vocab),
+        "condition_vocab_lower": [str(condition).lower() for condition in condition_vocab],
+        "row_by_id": {patient["patient_id"]: row for row, patient in enumerate(patients)},
+    }
+
+
+def eligible_mask(index: dict, criteria: dict) -> np.ndarray:
+    """
+    Boolean mask of patients passing the basic condition / gender / age filters.
+
+    Condition and gender pick the matching (condition, gender) buckets; the age
+    range is then checked only for the patients in those buckets.
+    """
+    age_min = criteria.get("age_range", {}).get("min", 18)
+    age_max = criteria.get("age_range", {}).get("max", 99)
+    required_gender = criteria.get("gender")
+    required_conditions = criteria.get("conditions", [])
+
+    mask = np.zeros(len(index["age"]), dtype=bool)
+
+    allowed_conditions = None
+    if required_conditions:
+        # Exact match, or partial (substring) match for hackathon, decided once per distinct condition
+        required = set(required_conditions)
+        lowered = [cond.lower() for cond in required_conditions]
+        allowed_conditions = {
+            code for code, (condition, condition_lower) in enumerate(
+                zip(index["condition_vocab"], index["condition_vocab_lower"])
+            )
+            if condition in required or any(cond in condition_lower for cond in lowered)
+        }
+        if not allowed_conditions:
+            return mask
+
+    gender_code = None
+    if required_gender:
+        if required_gender not in index["gender_vocab"]:
+            return mask
+        gender_code = index["gender_vocab"].index(required_gender)
+
+    if allowed_conditions is None and gender_code is None:
+        # Only the age predicate applies; no bucket gathering needed
+        ages = index["age"]
+        return (ages >= age_min) & (ages <= age_max)
+
+    rows = [
+        bucket for (condition, gender), bucket in index["buckets"].items()
+        if (allowed_conditions is None or condition in allowed_conditions)
+        and (gender_code is None or gender == gender_code)
+    ]
+    if not rows:
+        return mask
+
+    rows = np.concatenate(rows)
+    ages = index["age"][rows]
+    mask[rows[(ages >= age_min) & (ages <= age_max)]] = True
+    return mask
+
+
+def pattern_members(
+    pattern: dict,
+    rank: int,
+    num_patterns: int,
+    row_by_id: dict,
+    num_patients: int,
+    limit: int
+) -> np.ndarray:
+    """
+    Up to `limit` patient positions belonging to a pattern.
+
+    Uses the Pattern Discovery membership when the pattern carries it. Its
+    member_ids are looked up in this agent's own patient list (which is loaded
+    separately, so positions would not be comparable), skipping ids not held
+    here. Without membership, or when none of the ids are known, the patient
+    list is dealt round-robin across the patterns in use, so each pattern still
+    draws a distinct set of patients.
+    """
+    member_ids = pattern.get("member_ids") or []
+    rows = [row for row in map(row_by_id.get, member_ids[:limit]) if row is not None]
+    if rows:
+        return np.asarray(rows, dtype=np.intp)
+    return np.arange(rank, num_patients, max(num_patterns, 1))[:limit]
+
+
+@dataclass(slots=True)
+class Candidate:
+    """
+    A discovered patient, holding a reference to its cached patient record; the
+    nested wire dict is only built by to_wire() at send time.
+
+    No embedding is sent: a candidate's embedding is its pattern's centroid, which
+    Matching already receives once per pattern, so it resolves it from pattern_id.
+    """
+    patient: dict
+    pattern_id: str
+
+    def to_wire(self) -> dict:
+        patient = self.patient
+        return {
+            "patient_id": patient["patient_id"],
+            "pattern_id": self.pattern_id,
+            "demographics": {
+                "age": patient["age"],
+                "gender": patient["gender"]
+            },
+            "clinical_data": {
+                "primary_condition": patient["primary_condition"],
+                "medications": patient.get("medications", []),
+                "lab_values": patient.get("lab_values", {}),
+                "enrollment_history": patient.get("enrollment_history", 0)
+            },
+            "location": {
+                "lat": patient.get("latitude", 0.0),
+                "lon": patient.get("longitude", 0.0)
+            }
+        }
+
+
+def discover_candidates(patients: list, patterns: list, criteria: dict, max_results: int, index: dict = None) -> list[Candidate]:
     """
     Discover patient candidates based on patient patterns and eligibility criteria.
 
@@ -151,67 +289,35 @@ def discover_candidates(patients: list, patterns: list, criteria: dict, max_resu
     """
     candidates = []
 
-    age_min = criteria.get("age_range", {}).get("min", 18)
-    age_max = criteria.get("age_range", {}).get("max", 99)
-    required_gender = criteria.get("gender")
-    required_conditions = criteria.get("conditions", [])
+    if index is None:
+        index = build_patient_index(patients)
+
+    # Eligibility doesn't depend on the pattern, so filter every patient once
+    eligible = eligible_mask(index, criteria)
+    taken = np.zeros(len(patients), dtype=bool)
+    used_patterns = patterns[:10]
 
     # For each pattern, select candidate patients
-    patients_per_pattern = max(10, max_results // max(len(patterns), 1))
+    patients_per_pattern = members_per_pattern(len(patterns), max_results)
 
-    for pattern in patterns[:10]:  # Top 10 patterns
+    for rank, pattern in enumerate(used_patterns):  # Top 10 patterns
         pattern_id = pattern.get("pattern_id")
         pattern_size = pattern.get("size", 0)
 
-        # Simulate selecting patients from this pattern
-        # In production, would use actual pattern membership from Pattern Discovery
         num_candidates = min(patients_per_pattern, pattern_size)
+        members = pattern_members(
+            pattern, rank, len(used_patterns), index["row_by_id"], len(patients), num_candidates
+        )
+        # Skip patients an earlier pattern already contributed
+        selected = members[eligible[members] & ~taken[members]][:max_results - len(candidates)]
+        taken[selected] = True
 
-        for i, patient in enumerate(patients[:num_candidates]):
-            # Basic eligibility filtering
-            if not (age_min <= patient.get("age", 0) <= age_max):
-                continue
-
-            if required_gender and patient.get("gender") != required_gender:
-                continue
-
-            # Check condition match
-            patient_condition = patient.get("primary_condition", "")
-            if required_conditions and patient_condition not in required_conditions:
-                # Allow partial match for hackathon
-                if not any(cond.lower() in patient_condition.lower() for cond in required_conditions):
-                    continue
-
-            # Create candidate
-            candidate = {
-                "patient_id": patient["patient_id"],
-                "pattern_id": pattern_id,
-                "embedding": pattern.get("centroid", [0.0] * 50),  # Use pattern centroid
-                "demographics": {
-                    "age": patient["age"],
-                    "gender": patient["gender"]
-                },
-                "clinical_data": {
-                    "primary_condition": patient["primary_condition"],
-                    "medications": patient.get("medications", []),
-                    "lab_values": patient.get("lab_values", {}),
-                    "enrollment_history": patient.get("enrollment_history", 0)
-                },
-                "location": {
-                    "lat": patient.get("latitude", 0.0),
-                    "lon": patient.get("longitude", 0.0)
-                }
-            }
-
-            candidates.append(candidate)
-
-            if len(candidates) >= max_results:
-                break
+        candidates.extend(Candidate(patients[i], pattern_id) for i in selected.tolist())
 
         if len(candidates) >= max_results:
-            break
+            return candidates
 
-    return candidates[:max_results]
+    return candidates
 
 
 @agent.on_message(model=AgentStatus)
@@ -242,7 +348,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
@@ -16,10 +16,13 @@ import logging
 import time
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+import copy
+from functools import lru_cache
+from cachetools import LRUCache
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -31,9 +34,8 @@ from uagents_core.contrib.protocols.chat import (
 
 from agents.models import EligibilityRequest, EligibilityCriteria, AgentStatus
 from agents.config import AgentConfig, AgentRegistry
+from agents.startup import connect_to_coordinator
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -54,11 +56,13 @@ agent_state = {
     "requests_processed": 0,
     "start_time": time.time(),
     "data_loader": None,
-    "trial_cache": {},
+    "trial_cache": LRUCache(maxsize=512),  # Bounded for long-running deployments
+    "trial_by_id": {},
     "criteria_mapper": None,
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -68,37 +72,14 @@ async def startup(ctx: Context):
     AgentRegistry.register("eligibility", ctx.agent.address)
     agent_state["data_loader"] = ClinicalDataLoader()
     agent_state["criteria_mapper"] = TrialCriteriaMapper()
+    agent_state["trial_by_id"] = build_trial_index(agent_state["data_loader"])
+
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Eligibility Agent! Ready to extract and parse trial eligibility criteria!"
+    )
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Eligibility Agent! Ready to extract and parse trial eligibility criteria!"
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
 
 @agent.on_message(model=EligibilityRequest)
 async def handle_eligibility_request(ctx: Context, sender: str, msg: EligibilityRequest):
@@ -113,11 +94,9 @@ async def handle_eligibility_request(ctx: Context, sender: str, msg: Eligibility
             trial_data = msg.trial_data
             agent_state["trial_cache"][msg.trial_id] = trial_data
         else:
-            # Fetch from data loader
-            data_loader = agent_state["data_loader"]
-            trials_df = data_loader.generate_synthetic_trials("diabetes", 100)
-            matching = trials_df[trials_df['nct_id'] == msg.trial_id]
-            trial_data = matching.iloc[0].to_dict() if not matching.empty else trials_df.iloc[0].to_dict()
+            # Fall back to the synthetic trial index built at startup
+            trial_by_id = agent_state["trial_by_id"]
+            trial_data = trial_by_id.get(msg.trial_id) or next(iter(trial_by_id.values()))
             agent_state["trial_cache"][msg.trial_id] = trial_data
 
         # Extract criteria
@@ -140,6 +119,40 @@ async def handle_eligibility_request(ctx: Context, sender: str, msg: Eligibility
         await ctx.send(sender, error_criteria)
 
 
+def build_trial_index(data_loader: ClinicalDataLoader) -> dict:
+    """Generate the fallback synthetic trials once and index them by NCT id"""
+    trials = data_loader.generate_synthetic_trials("diabetes", 100)
+    return {trial["nct_id"]: trial for trial in trials}
+
+
+# Default lab requirements implied by a condition keyword: (keyword, lab, bounds)
+LAB_REQUIREMENT_RULES = (
+    ("diabetes", "HbA1c", {"min": 6.5, "max": 10.0}),
+    ("cardiovascular", "cholesterol", {"min": 200, "max": 300}),
+    ("hypertension", "blood_pressure_systolic", {"min": 140, "max": 180}),
+)
+
+
+def map_criteria_to_codes(criteria_text: tuple) -> dict:
+    """
+    TrialCriteriaMapper.map_criteria_to_codes memoized on the criteria text.
+
+    The mapping scan is the expensive part of extract_criteria and only depends
+    on the text, so repeat trials skip it. Each caller gets its own copy, since
+    pydantic keeps the nested found_terms dicts rather than copying them.
+    """
+    return copy.deepcopy(_map_criteria_to_codes(criteria_text))
+
+
+@lru_cache(maxsize=1024)
+def _map_criteria_to_codes(criteria_text: tuple) -> dict:
+    mapper = agent_state.get("criteria_mapper")
+    if mapper is None:
+        # Fallback if mapper not initialized (kept, so the terminology loads once)
+        mapper = agent_state["criteria_mapper"] = TrialCriteriaMapper()
+    return mapper.map_criteria_to_codes(list(criteria_text))
+
+
 def extract_criteria(trial_data: dict) -> EligibilityCriteria:
     """
     Extract structured criteria from trial data WITH medical codes.
@@ -168,26 +181,19 @@ def extract_criteria(trial_data: dict) -> EligibilityCriteria:
     else:
         inclusion_criteria = inclusion_raw if isinstance(inclusion_raw, list) else []
 
-    # NEW: Use TrialCriteriaMapper to extract medical codes
-    mapper = agent_state.get("criteria_mapper")
-    if mapper is None:
-        # Fallback if mapper not initialized
-        mapper = TrialCriteriaMapper()
-
     # Combine condition and inclusion criteria for mapping
     all_criteria_text = [condition] + inclusion_criteria if condition else inclusion_criteria
 
-    # Map to medical codes
-    mapped_codes = mapper.map_criteria_to_codes(all_criteria_text)
+    # NEW: Use TrialCriteriaMapper to extract medical codes
+    mapped_codes = map_criteria_to_codes(tuple(all_criteria_text))
 
     # Parse lab requirements based on condition (backward compatibility)
-    lab_requirements = {}
-    if "diabetes" in condition.lower():
-        lab_requirements["HbA1c"] = {"min": 6.5, "max": 10.0}
-    if "cardiovascular" in condition.lower():
-        lab_requirements["cholesterol"] = {"min": 200, "max": 300}
-    if "hypertension" in condition.lower():
-        lab_requirements["blood_pressure_systolic"] = {"min": 140, "max": 180}
+    condition_lower = condition.lower()
+    lab_requirements = {
+        lab: dict(bounds)
+        for keyword, lab, bounds in LAB_REQUIREMENT_RULES
+        if keyword in condition_lower
+    }
 
     # Override age/gender from mapped data if available
     if mapped_codes["demographics"]["age_range"]:
@@ -245,7 +251,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
@@ -14,13 +14,14 @@ Uses Pattern Discovery's pre-computed embeddings for similarity calculation.
 from uagents import Agent, Context, Protocol
 import logging
 import time
+import asyncio
 import numpy as np
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -32,9 +33,8 @@ from uagents_core.contrib.protocols.chat import (
 
 from agents.models import MatchingRequest, MatchingResponse, AgentStatus
 from agents.config import AgentConfig, AgentRegistry
+from agents.startup import connect_to_coordinator
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -54,7 +54,8 @@ agent_state = {
     "start_time": time.time(),
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -64,36 +65,12 @@ async def startup(ctx: Context):
     AgentRegistry.register("matching", ctx.agent.address)
     
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Matching Agent! Ready to score patient candidates using Pattern Discovery similarity metrics!"
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Matching Agent! Ready to score patient candidates using Pattern Discovery similarity metrics!"
+    )
+
 
 @agent.on_message(model=MatchingRequest)
 async def handle_matching_request(ctx: Context, sender: str, msg: MatchingRequest):
@@ -105,8 +82,8 @@ async def handle_matching_request(ctx: Context, sender: str, msg: MatchingReques
         candidates = msg.candidates
         patterns = msg.patterns
 
-        # Score each candidate
-        matches = score_candidates(candidates, criteria, patterns)
+        # Score each candidate (off the event loop, so other messages aren't held up)
+        matches = await asyncio.to_thread(score_candidates, candidates, criteria, patterns)
 
         # Calculate score distribution
         distribution = calculate_distribution(matches)
@@ -146,7 +123,29 @@ def score_candidates(candidates: list, criteria: dict, patterns: list) -> list:
     # Build pattern lookup for success rates
     pattern_lookup = {p.get("pattern_id"): p for p in patterns}
 
-    for candidate in candidates:
+    # Every score component as one vector over the candidates (0-1)
+    eligibility = eligibility_scores(candidates, criteria)
+    similarity = np.asarray(similarity_scores(candidates, pattern_lookup), dtype=float)
+    # Enrollment probability from the candidate's pattern
+    probability = np.array([
+        pattern_lookup.get(c.get("pattern_id"), {}).get("enrollment_success_rate", 0.75)
+        for c in candidates
+    ], dtype=float)
+
+    # Calculate overall score (weighted combination)
+    overall = eligibility * 0.4 + similarity * 0.3 + probability * 0.3
+
+    overall, eligibility, similarity, probability = (
+        np.round(v, 3) for v in (overall, eligibility, similarity, probability)
+    )
+
+    # Sort by overall score descending (stable, so ties keep candidate order)
+    # and build the match dicts directly in that order
+    order = np.argsort(-overall, kind="stable")
+    scored = zip(*(v[order].tolist() for v in (overall, eligibility, similarity, probability)))
+
+    for i, (overall_score, eligibility_score, similarity_score, enrollment_probability) in zip(order.tolist(), scored):
+        candidate = candidates[i]
         patient_id = candidate.get("patient_id")
         pattern_id = candidate.get("pattern_id")
         demographics = candidate.get("demographics", {})
@@ -156,24 +155,6 @@ def score_candidates(candidates: list, criteria: dict, patterns: list) -> list:
         # Get associated pattern
         pattern = pattern_lookup.get(pattern_id, {})
 
-        # Calculate eligibility score (0-1)
-        eligibility_score = calculate_eligibility_score(demographics, clinical_data, criteria)
-
-        # Calculate similarity score using Pattern Discovery embeddings (0-1)
-        candidate_embedding = candidate.get("embedding", [])
-        pattern_centroid = pattern.get("centroid", [])
-        similarity_score = calculate_similarity(candidate_embedding, pattern_centroid)
-
-        # Get enrollment probability from pattern
-        enrollment_probability = pattern.get("enrollment_success_rate", 0.75)
-
-        # Calculate overall score (weighted combination)
-        overall_score = (
-            eligibility_score * 0.4 +
-            similarity_score * 0.3 +
-            enrollment_probability * 0.3
-        )
-
         # Generate match reasons
         match_reasons = generate_match_reasons(demographics, clinical_data, criteria, pattern)
 
@@ -183,10 +164,10 @@ def score_candidates(candidates: list, criteria: dict, patterns: list) -> list:
         match = {
             "patient_id": patient_id,
             "pattern_id": pattern_id,
-            "overall_score": round(overall_score, 3),
-            "eligibility_score": round(eligibility_score, 3),
-            "similarity_score": round(similarity_score, 3),
-            "enrollment_probability": round(enrollment_probability, 3),
+            "overall_score": overall_score,
+            "eligibility_score": eligibility_score,
+            "similarity_score": similarity_score,
+            "enrollment_probability": enrollment_probability,
             "demographics": demographics,
             "location": location,
             "match_reasons": match_reasons,
@@ -195,37 +176,96 @@ def score_candidates(candidates: list, criteria: dict, patterns: list) -> list:
 
         matches.append(match)
 
-    # Sort by overall score descending
-    matches.sort(key=lambda x: x["overall_score"], reverse=True)
-
     return matches
 
 
-def calculate_eligibility_score(demographics: dict, clinical_data: dict, criteria: dict) -> float:
-    """Calculate how well patient meets eligibility criteria"""
-    score = 1.0
-
-    # Age check
-    age = demographics.get("age", 0)
+def eligibility_scores(candidates: list, criteria: dict) -> np.ndarray:
+    """Calculate how well each patient meets eligibility criteria, as one score vector"""
+    # Age check: penalize if outside range
+    ages = np.array([c.get("demographics", {}).get("age", 0) for c in candidates], dtype=float)
     age_min = criteria.get("age_range", {}).get("min", 18)
     age_max = criteria.get("age_range", {}).get("max", 99)
-    if not (age_min <= age <= age_max):
-        score *= 0.5  # Penalize if outside range
+    scores = np.where((ages >= age_min) & (ages <= age_max), 1.0, 0.5)
 
-    # Lab values check
+    # Lab values check, one column per required lab
     lab_requirements = criteria.get("lab_requirements", {})
-    patient_labs = clinical_data.get("lab_values", {})
-
     for lab_name, lab_range in lab_requirements.items():
-        if lab_name in patient_labs:
-            value = patient_labs.get(lab_name)
-            if isinstance(value, (int, float)):
-                min_val = lab_range.get("min", 0)
-                max_val = lab_range.get("max", 1000)
-                if not (min_val <= value <= max_val):
-                    score *= 0.8
+        values = [c.get("clinical_data", {}).get("lab_values", {}).get(lab_name) for c in candidates]
+        numeric = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+        if not numeric.any():
+            continue
+        column = np.array([v if ok else 0.0 for v, ok in zip(values, numeric)], dtype=float)
+        min_val = lab_range.get("min", 0)
+        max_val = lab_range.get("max", 1000)
+        scores[numeric & ~((column >= min_val) & (column <= max_val))] *= 0.8
 
-    return max(score, 0.1)  # Minimum 0.1
+    return np.maximum(scores, 0.1)  # Minimum 0.1
+
+
+def unit_centroids(pattern_lookup: dict) -> dict:
+    """
+    pattern_id -> L2-normalized float32 centroid (first 50 dimensions), or None
+    when the centroid is missing, empty, non-numeric or all zeros.
+    """
+    units = {}
+    for pattern_id, pattern in pattern_lookup.items():
+        try:
+            centroid = np.asarray(pattern.get("centroid", [])[:50], dtype=np.float32)
+        except (TypeError, ValueError):
+            units[pattern_id] = None
+            continue
+        norm = np.linalg.norm(centroid) if centroid.ndim == 1 else 0.0
+        units[pattern_id] = centroid / norm if norm > 0 else None
+    return units
+
+
+def similarity_scores(candidates: list, pattern_lookup: dict) -> list:
+    """
+    calculate_similarity of each candidate's embedding to its pattern centroid.
+
+    Centroids are normalized once per pattern. Discovery omits the embedding when
+    it is just the pattern centroid, so those candidates get the centroid's
+    self-similarity; candidates carrying their own embedding are stacked and
+    scored against their gathered unit centroids in one row-wise dot product.
+    """
+    units = unit_centroids(pattern_lookup)
+    scores = [0.7] * len(candidates)  # Default when the centroid can't score
+    explicit = []  # Positions of candidates with their own embedding
+
+    for i, candidate in enumerate(candidates):
+        unit = units.get(candidate.get("pattern_id"))
+        if unit is None:
+            continue
+        if candidate.get("embedding"):
+            explicit.append(i)
+        else:
+            scores[i] = (float(unit @ unit) + 1) / 2
+
+    if not explicit:
+        return scores
+
+    embeddings = [candidates[i]["embedding"] for i in explicit]
+    pattern_ids = [candidates[i].get("pattern_id") for i in explicit]
+    try:
+        emb = np.array([e[:50] for e in embeddings], dtype=np.float32)  # Use first 50 dimensions
+        cen = np.stack([units[pattern_id] for pattern_id in pattern_ids])
+        if emb.shape != cen.shape:
+            raise ValueError("embedding and centroid dimensions differ")
+    except (TypeError, ValueError):
+        # Ragged or non-numeric embeddings: score pair by pair
+        for i, embedding, pattern_id in zip(explicit, embeddings, pattern_ids):
+            scores[i] = calculate_similarity(embedding, pattern_lookup[pattern_id].get("centroid", []))
+        return scores
+
+    norms = np.linalg.norm(emb, axis=1)
+    dots = np.einsum("ij,ij->i", emb, cen)
+    valid = norms > 0
+    sims = np.full(len(emb), 0.7)
+    sims[valid] = (dots[valid] / norms[valid] + 1) / 2  # Normalize to 0-1
+
+    for i, score in zip(explicit, sims.tolist()):
+        scores[i] = score
+    return scores
 
 
 def calculate_similarity(embedding1: list, embedding2: list) -> float:
@@ -234,13 +274,14 @@ def calculate_similarity(embedding1: list, embedding2: list) -> float:
         return 0.7  # Default
 
     try:
-        arr1 = np.array(embedding1[:50])  # Use first 50 dimensions
-        arr2 = np.array(embedding2[:50])
+        # Use first 50 dimensions (no copy for inputs that are already float arrays)
+        arr1 = np.asarray(embedding1[:50], dtype=float)
+        arr2 = np.asarray(embedding2[:50], dtype=float)
 
-        # Cosine similarity
-        dot_product = np.dot(arr1, arr2)
-        norm1 = np.linalg.norm(arr1)
-        norm2 = np.linalg.norm(arr2)
+        # Cosine similarity; at 50 dimensions sqrt(dot) is cheaper than linalg.norm
+        dot_product = arr1.dot(arr2)
+        norm1 = np.sqrt(arr1.dot(arr1))
+        norm2 = np.sqrt(arr2.dot(arr2))
 
         if norm1 == 0 or norm2 == 0:
             return 0.7
@@ -301,16 +342,15 @@ def calculate_distribution(matches: list) -> dict:
     if not matches:
         return {"high": 0, "medium": 0, "low": 0, "average": 0.0}
 
-    scores = [m["overall_score"] for m in matches]
-    high = sum(1 for s in scores if s >= 0.8)
-    medium = sum(1 for s in scores if 0.5 <= s < 0.8)
-    low = sum(1 for s in scores if s < 0.5)
+    scores = np.fromiter((m["overall_score"] for m in matches), dtype=float, count=len(matches))
+    high = int(np.count_nonzero(scores >= 0.8))
+    low = int(np.count_nonzero(scores < 0.5))
 
     return {
         "high": high,
-        "medium": medium,
+        "medium": len(matches) - high - low,
         "low": low,
-        "average": round(np.mean(scores), 3)
+        "average": round(float(scores.mean()), 3)
     }
 
 
@@ -340,7 +380,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
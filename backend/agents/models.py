@@ -78,6 +78,7 @@ class PatternMatch(Model):
     confidence: float
     enrollment_success_rate: float
     characteristics: Dict[str, Any] = {}  # Average characteristics of patients in this pattern
+    member_ids: List[str] = []  # patient_ids of this pattern's patients (up to Discovery's per-pattern limit), when known
 
 
 class PatternResponse(Model):
@@ -104,7 +105,7 @@ class PatientCandidate(Model):
     """Single patient candidate"""
     patient_id: str
     pattern_id: str
-    embedding: List[float]
+    embedding: List[float] = []  # Omitted when it is the pattern centroid
     demographics: Dict[str, Any]
     clinical_data: Dict[str, Any]
     location: Dict[str, float]  # e.g., {'lat': 40.7, 'lon': -74.0}
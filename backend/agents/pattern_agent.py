@@ -16,10 +16,10 @@ import time
 import numpy as np
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -30,10 +30,9 @@ from uagents_core.contrib.protocols.chat import (
 )
 
 from agents.models import PatternRequest, PatternResponse, AgentStatus
-from agents.config import AgentConfig, AgentRegistry
+from agents.config import AgentConfig, AgentRegistry, members_per_pattern
+from agents.startup import connect_to_coordinator
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -55,7 +54,8 @@ agent_state = {
     "pattern_cache": {},
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -65,36 +65,12 @@ async def startup(ctx: Context):
     AgentRegistry.register("pattern", ctx.agent.address)
     # Patterns will be loaded from context storage when needed
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Pattern Agent! Ready to match pre-discovered patient patterns to trial criteria!"
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Pattern Agent! Ready to match pre-discovered patient patterns to trial criteria!"
+    )
+
 
 @agent.on_message(model=PatternRequest)
 async def handle_pattern_request(ctx: Context, sender: str, msg: PatternRequest):
@@ -196,12 +172,19 @@ def match_patterns_to_criteria(patterns: list, criteria: dict, min_size: int) ->
             "characteristics": {
                 "estimated_age_range": f"{age_min}-{age_max}",
                 "conditions": conditions
-            }
+            },
+            "member_ids": pattern.get("member_ids", [])
         })
 
     # Sort by match score descending
     matched.sort(key=lambda x: x["match_score"], reverse=True)
-    return matched[:20]  # Top 20 patterns
+    matched = matched[:20]  # Top 20 patterns
+
+    # Discovery reads at most this many members per pattern; don't ship the rest
+    limit = members_per_pattern(len(matched))
+    for pattern in matched:
+        pattern["member_ids"] = pattern["member_ids"][:limit]
+    return matched
 
 
 @agent.on_message(model=AgentStatus)
@@ -230,7 +213,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
@@ -17,10 +17,10 @@ import time
 import numpy as np
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -32,9 +32,8 @@ from uagents_core.contrib.protocols.chat import (
 
 from agents.models import PredictionRequest, EnrollmentForecast, AgentStatus
 from agents.config import AgentConfig, AgentRegistry
+from agents.startup import connect_to_coordinator
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -54,7 +53,8 @@ agent_state = {
     "start_time": time.time(),
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -64,36 +64,12 @@ async def startup(ctx: Context):
     AgentRegistry.register("prediction", ctx.agent.address)
     
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Prediction Agent! Ready to forecast enrollment timelines using pattern analysis!"
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Prediction Agent! Ready to forecast enrollment timelines using pattern analysis!"
+    )
+
 
 @agent.on_message(model=PredictionRequest)
 async def handle_prediction_request(ctx: Context, sender: str, msg: PredictionRequest):
@@ -294,7 +270,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
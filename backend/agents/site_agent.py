@@ -23,10 +23,10 @@ import numpy as np
 from collections import defaultdict
 import sys
 import os
-from datetime import datetime
-from uuid import uuid4
+from datetime import datetime, timezone
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import Fetch.AI official chat protocol
 from uagents_core.contrib.protocols.chat import (
@@ -38,9 +38,8 @@ from uagents_core.contrib.protocols.chat import (
 
 from agents.models import SiteRequest, SiteResponse, AgentStatus
 from agents.config import AgentConfig, AgentRegistry
+from agents.startup import connect_to_coordinator
 from agentverse_config import (
-    get_agent_address,
-    is_agentverse_mode,
     get_agents_to_talk_to,
     validate_configuration
 )
@@ -62,7 +61,8 @@ agent_state = {
     "feasibility_scorer": None,
     "agentverse_addresses": {},
     "is_agentverse": False,
-    "coordinator_address": None
+    "coordinator_address": None,
+    "greeting_task": None
 }
 
 
@@ -73,36 +73,12 @@ async def startup(ctx: Context):
     # Initialize feasibility scorer
     agent_state["feasibility_scorer"] = SiteFeasibilityScorer()
 
-    # Check if running in Agentverse mode
-    agent_state["is_agentverse"] = is_agentverse_mode()
-
-    if agent_state["is_agentverse"]:
-        logger.info("🌐 Running in AGENTVERSE MODE")
-
-        # Get coordinator address
-        coordinator_addr = get_agent_address("coordinator")
-        if coordinator_addr:
-            agent_state["coordinator_address"] = coordinator_addr
-            logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
-
-            # Send greeting to coordinator
-            try:
-                greeting = ChatMessage(
-                    timestamp=datetime.utcnow(),
-                    msg_id=uuid4(),
-                    content=[TextContent(
-                        type="text",
-                        text="Hello from Site Agent! Ready to recommend trial sites based on feasibility and patient geography!"
-                    )]
-                )
-                await ctx.send(coordinator_addr, greeting)
-                logger.info(f"  ✓ Sent greeting to coordinator")
-            except Exception as e:
-                logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
-        else:
-            logger.warning(f"  ⚠ Missing coordinator address - update agentverse_config.py")
-    else:
-        logger.info("🏠 Running in LOCAL MODE")
+    connect_to_coordinator(
+        ctx,
+        agent_state,
+        "Hello from Site Agent! Ready to recommend trial sites based on feasibility and patient geography!"
+    )
+
 
 @agent.on_message(model=SiteRequest)
 async def handle_site_request(ctx: Context, sender: str, msg: SiteRequest):
@@ -346,7 +322,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
 
             # Send acknowledgment
             ack = ChatAcknowledgement(
-                timestamp=datetime.utcnow(),
+                timestamp=datetime.now(timezone.utc),
                 acknowledged_msg_id=msg.msg_id
             )
             await ctx.send(sender, ack)
@@ -0,0 +1,58 @@
+"""
+Startup steps shared by the worker agents (every agent except the coordinator).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict
+from uuid import uuid4
+
+from uagents import Context
+from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
+
+from agents.config import AgentConfig
+from agentverse_config import get_agent_address, is_agentverse_mode
+
+logger = logging.getLogger(__name__)
+
+
+def connect_to_coordinator(ctx: Context, agent_state: Dict[str, Any], greeting: str):
+    """
+    In Agentverse mode, load the coordinator address into agent_state and
+    greet it. The greeting is sent in the background so startup doesn't
+    wait on the round-trip, and only when the coordinator serves chat.
+    """
+    agent_state["is_agentverse"] = is_agentverse_mode()
+
+    if not agent_state["is_agentverse"]:
+        logger.info("🏠 Running in LOCAL MODE")
+        return
+
+    logger.info("🌐 Running in AGENTVERSE MODE")
+
+    coordinator_addr = get_agent_address("coordinator")
+    if not coordinator_addr:
+        logger.warning("  ⚠ Missing coordinator address - update agentverse_config.py")
+        return
+
+    agent_state["coordinator_address"] = coordinator_addr
+    logger.info(f"  ✓ Loaded coordinator address: {coordinator_addr[:20]}...")
+
+    # Without ENABLE_CHAT_PROTOCOL=1 the coordinator has no ChatMessage handler
+    if AgentConfig.CHAT_PROTOCOL_ENABLED:
+        agent_state["greeting_task"] = asyncio.create_task(greet_coordinator(ctx, coordinator_addr, greeting))
+
+
+async def greet_coordinator(ctx: Context, coordinator_addr: str, text: str):
+    """Send the startup greeting to the coordinator"""
+    try:
+        greeting = ChatMessage(
+            timestamp=datetime.now(timezone.utc),
+            msg_id=uuid4(),
+            content=[TextContent(type="text", text=text)]
+        )
+        await ctx.send(coordinator_addr, greeting)
+        logger.info("  ✓ Sent greeting to coordinator")
+    except Exception as e:
+        logger.error(f"  ❌ Failed to send greeting to coordinator: {e}")
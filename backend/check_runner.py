@@ -0,0 +1,32 @@
+"""
+Script runner for the test_*.py checks, so they run without pytest:
+
+    if __name__ == "__main__":
+        run_checks("Testing ...", globals())
+"""
+
+import sys
+from typing import Any, Dict
+
+
+def run_checks(title: str, namespace: Dict[str, Any]):
+    """Run every test_* function in `namespace`, print ✓/✗ per check and exit non-zero on failure"""
+    print("=" * 70)
+    print(title)
+    print("=" * 70)
+    print()
+
+    all_passed = True
+    for name, check in namespace.items():
+        if not (name.startswith("test_") and callable(check)):
+            continue
+        try:
+            check()
+            print(f"✓ {name}")
+        except AssertionError as e:
+            all_passed = False
+            print(f"✗ {name}: {e}")
+
+    print()
+    print("All checks passed" if all_passed else "Some checks failed")
+    sys.exit(0 if all_passed else 1)
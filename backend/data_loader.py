@@ -3,6 +3,7 @@ import numpy as np
 from typing import Dict, List, Tuple
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 import logging
 import os
@@ -13,6 +14,11 @@ from fhir_code_extractor import FHIRCodeExtractor
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for ClinicalTrials.gov, so paginated fetches and
+# repeated trial lookups reuse pooled connections instead of a new TLS handshake each
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
 class ClinicalDataLoader:
     """Load and prepare clinical trial and patient data"""
     
@@ -247,7 +253,7 @@ class ClinicalDataLoader:
                 logger.info(f"Requesting {params['pageSize']} trials (total so far: {fetched_count})")
 
                 # Make API request with timeout
-                response = requests.get(endpoint, params=params, timeout=30)
+                response = http_session.get(endpoint, params=params, timeout=30)
                 response.raise_for_status()
 
                 data = response.json()
@@ -374,6 +380,10 @@ class ClinicalDataLoader:
 
     def _generate_synthetic_trials(self, condition: str, max_trials: int) -> pd.DataFrame:
         """Generate synthetic trials as fallback"""
+        return pd.DataFrame(self.generate_synthetic_trials(condition, max_trials))
+
+    def generate_synthetic_trials(self, condition: str = "diabetes", max_trials: int = 100) -> List[Dict]:
+        """Generate synthetic trials as plain records (no DataFrame)"""
         logger.info(f"Generating {max_trials} synthetic trials for {condition}")
         trials = []
         for i in range(max_trials):
@@ -381,17 +391,17 @@ class ClinicalDataLoader:
                 'nct_id': f'NCT{str(100000 + i).zfill(8)}',
                 'title': f'Study of {condition} Treatment {i}',
                 'condition': condition,
-                'phase': np.random.choice(['Phase 1', 'Phase 2', 'Phase 3', 'Phase 4']),
-                'enrollment_target': np.random.randint(50, 500),
-                'min_age': np.random.randint(18, 45),
-                'max_age': np.random.randint(60, 90),
-                'gender': np.random.choice(['All', 'Male', 'Female']),
+                'phase': str(np.random.choice(['Phase 1', 'Phase 2', 'Phase 3', 'Phase 4'])),
+                'enrollment_target': int(np.random.randint(50, 500)),
+                'min_age': int(np.random.randint(18, 45)),
+                'max_age': int(np.random.randint(60, 90)),
+                'gender': str(np.random.choice(['All', 'Male', 'Female'])),
                 'inclusion_criteria': self._generate_criteria(),
-                'sites': np.random.randint(1, 20),
+                'sites': int(np.random.randint(1, 20)),
                 'status': 'Recruiting'
             }
             trials.append(trial)
-        return pd.DataFrame(trials)
+        return trials
 
     def _save_sample_trials(self, trials: List[Dict]):
         """Save a sample of trials for sanity checking"""
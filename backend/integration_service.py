@@ -2,14 +2,12 @@ import asyncio
 from typing import Dict, List, Any
 import json
 from datetime import datetime
-from data_loader import ClinicalDataLoader
+from data_loader import ClinicalDataLoader, http_session
 from pattern_discovery_engine import PatternDiscoveryEngine
-import requests
 import logging
 import numpy as np
 import pandas as pd
 import time
-import requests
 from agents.config import AgentRegistry 
 
 AgentRegistry.register("coordinator", "http://127.0.0.1:8000")
@@ -65,7 +63,7 @@ class TrialMatchIntegrationService:
         if trial_id:
             logger.info(f"Fetching trial {trial_id} from ClinicalTrials.gov...")
             try:
-                response = requests.get(
+                response = http_session.get(
                     f"https://clinicaltrials.gov/api/v2/studies/{trial_id}",
                     timeout=10
                 )
@@ -92,7 +90,9 @@ class TrialMatchIntegrationService:
         # Step 2: Pattern discovery (unsupervised)
         logger.info("Step 2: Running Pattern discovery...")
         embeddings = self.pattern_engine.create_universal_embedding(data)
-        pattern_results = self.pattern_engine.discover_patterns(embeddings)
+        pattern_results = self.pattern_engine.discover_patterns(
+            embeddings, [p['patient_id'] for p in data['patients']]
+        )
 
         # Step 3: Get pattern insights
         insights = self.pattern_engine.get_pattern_insights()
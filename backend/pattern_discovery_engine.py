@@ -36,6 +36,7 @@ class PatternDiscoveryEngine:
             allow_single_cluster=False  # Don't force everything into one cluster
         )
         self.patterns = []
+        self.pattern_members = {}
         
     def create_universal_embedding(self, data: Dict) -> np.ndarray:
         """Create multi-modal embeddings combining text, numeric, and geographic data"""
@@ -73,10 +74,15 @@ class PatternDiscoveryEngine:
         logger.info(f"Created embeddings with shape: {embeddings.shape}")
         return embeddings
     
-    def discover_patterns(self, embeddings: np.ndarray) -> Dict:
+    def discover_patterns(self, embeddings: np.ndarray, patient_ids: List[str] = None) -> Dict:
         """
         Discover patterns using unsupervised learning.
         No training data needed - finds natural clusters.
+
+        patient_ids (one per embedding row) label each pattern's members, so
+        agents with their own patient list can find them by id. Membership is
+        kept in self.pattern_members rather than in the pattern dicts, which
+        are served as-is by the API; see patterns_with_members().
         """
         logger.info("Starting unsupervised pattern discovery...")
         
@@ -95,6 +101,7 @@ class PatternDiscoveryEngine:
         # Analyze discovered patterns
         unique_clusters = set(cluster_labels) - {-1}  # Exclude noise points
         patterns = []
+        pattern_members = {}
         
         for cluster_id in unique_clusters:
             cluster_mask = cluster_labels == cluster_id
@@ -123,8 +130,12 @@ class PatternDiscoveryEngine:
                     'avg_intra_cluster_distance': float(avg_distance)
                 }
                 patterns.append(pattern)
+                pattern_members[pattern['pattern_id']] = (
+                    [patient_ids[i] for i in np.flatnonzero(cluster_mask)] if patient_ids else []
+                )
         
         self.patterns = patterns
+        self.pattern_members = pattern_members  # pattern_id -> patient_ids
         self.cluster_labels = cluster_labels  # Store for later use in insights
         self.original_embeddings = embeddings  # Store original embeddings for similarity
         self.reduced_embeddings_3d = reduced_embeddings_3d  # Store 3D embeddings for visualization
@@ -141,6 +152,17 @@ class PatternDiscoveryEngine:
             'cluster_labels': cluster_labels.tolist()[:1000]
         }
     
+    def patterns_with_members(self, limit: int) -> List[Dict]:
+        """
+        Copies of the discovered patterns carrying up to `limit` member_ids each,
+        for the Pattern Agent's pattern store. Discovery never reads past its
+        per-pattern limit, so the rest of the membership stays here.
+        """
+        return [
+            {**pattern, 'member_ids': self.pattern_members.get(pattern['pattern_id'], [])[:limit]}
+            for pattern in self.patterns
+        ]
+
     def match_to_trial(self, trial: Dict, patterns: List[Dict]) -> Dict:
         """Match discovered patterns to a specific trial using real similarity calculation"""
         # Extract trial requirements and create embedding
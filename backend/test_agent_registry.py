@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test AgentRegistry freezing.
+
+This script tests:
+1. The registry stays writable until every configured agent has registered
+2. A late agent (validation, which the coordinator never calls) can still register
+3. Once frozen, repeating a registration is a no-op and new/changed ones raise
+
+Usage:
+    python test_agent_registry.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from check_runner import run_checks
+from agents.config import AgentRegistry
+
+AGENTS = ["coordinator", "eligibility", "pattern", "discovery", "matching", "site", "prediction", "validation"]
+
+
+def register_all(names: list):
+    for name in names:
+        AgentRegistry.register(name, f"agent1q{name}")
+
+
+def test_incomplete_registry_is_not_complete():
+    AgentRegistry.clear()
+    register_all(AGENTS[:-1])
+    assert not AgentRegistry.is_complete()
+
+
+def test_late_registration_before_freeze():
+    AgentRegistry.clear()
+    # The coordinator's downstream agents are up, validation starts last
+    register_all(AGENTS[:-1])
+    register_all(AGENTS[-1:])
+    assert AgentRegistry.is_complete()
+    AgentRegistry.freeze()
+    assert AgentRegistry.get("validation") == "agent1qvalidation"
+
+
+def test_repeat_registration_after_freeze_is_noop():
+    AgentRegistry.clear()
+    register_all(AGENTS)
+    AgentRegistry.freeze()
+    AgentRegistry.register("validation", "agent1qvalidation")
+    assert AgentRegistry.get("validation") == "agent1qvalidation"
+
+
+def test_new_registration_after_freeze_raises():
+    AgentRegistry.clear()
+    register_all(AGENTS)
+    AgentRegistry.freeze()
+    for name, address in [("validation", "agent1qother"), ("extra", "agent1qextra")]:
+        try:
+            AgentRegistry.register(name, address)
+        except RuntimeError:
+            continue
+        raise AssertionError(f"register({name!r}, {address!r}) succeeded on a frozen registry")
+    assert AgentRegistry.get("validation") == "agent1qvalidation"
+
+
+def test_frozen_registry_is_read_only():
+    AgentRegistry.clear()
+    register_all(AGENTS)
+    AgentRegistry.freeze()
+    try:
+        AgentRegistry.all()["validation"] = "agent1qother"
+    except TypeError:
+        return
+    raise AssertionError("all() returned a writable mapping after freeze()")
+
+
+if __name__ == "__main__":
+    run_checks("Testing Agent Registry - Freezing", globals())
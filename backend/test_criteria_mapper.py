@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test Trial Criteria Mapper term lookup.
+
+This script tests:
+1. find_terms returns exactly the terms a substring scan over the terminology finds
+2. Condition/lab/medication lookups (names, variants, longest-match filtering)
+3. Exclusion detection and inclusion/exclusion code mapping
+
+Usage:
+    python test_criteria_mapper.py
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from check_runner import run_checks
+from trial_criteria_mapper import TrialCriteriaMapper
+
+TERMINOLOGY = {
+    "conditions": {
+        "diabetes": {"variants": ["DM"], "icd10": ["E11.9"], "snomed": ["73211009"], "display": "Diabetes"},
+        "type 2 diabetes": {"variants": ["T2DM", "Type II Diabetes"], "icd10": ["E11.9"], "snomed": ["44054006"],
+                            "display": "Type 2 diabetes mellitus"},
+        "diabetic nephropathy": {"variants": [], "icd10": ["E11.21"], "snomed": ["127013003"],
+                                 "display": "Diabetic nephropathy", "exclusion": True},
+    },
+    "lab_tests": {
+        "hba1c": {"variants": ["Hemoglobin A1c", "A1C"], "loinc": ["4548-4"], "display": "Hemoglobin A1c"},
+    },
+    "medications": {
+        "metformin": {"variants": ["Glucophage"], "rxnorm": ["6809"], "display": "Metformin"},
+        "insulin": {"variants": [], "rxnorm": ["5856"], "display": "Insulin"},
+    },
+    "exclusion_keywords": ["no history of", "exclude", "without"],
+}
+
+TEXTS = [
+    "Adults 18-65 with type 2 diabetes on metformin",
+    "HbA1c between 7% and 10% (Hemoglobin A1c)",
+    "No history of diabetic nephropathy",
+    "Patients with T2DM or Type II Diabetes, without insulin use",
+    "Healthy volunteers",
+    "",
+]
+
+
+def make_mapper(terminology: dict) -> TrialCriteriaMapper:
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(terminology, f)
+    try:
+        return TrialCriteriaMapper(terminology_path=f.name)
+    finally:
+        os.unlink(f.name)
+
+
+def baseline_terms(terminology: dict, text_lower: str) -> set:
+    """Every terminology term found with a plain `term in text` scan"""
+    terms = set(terminology.get("exclusion_keywords", []))
+    for db_name in ("conditions", "lab_tests", "medications"):
+        for name, info in terminology.get(db_name, {}).items():
+            terms.add(name)
+            terms.update(variant.lower() for variant in info.get("variants", []))
+    return {term for term in terms if term and term in text_lower}
+
+
+def test_find_terms_matches_substring_scan():
+    mapper = make_mapper(TERMINOLOGY)
+    for text in TEXTS:
+        assert mapper.find_terms(text.lower()) == baseline_terms(TERMINOLOGY, text.lower()), text
+
+
+def test_find_terms_reports_overlapping_terms():
+    mapper = make_mapper(TERMINOLOGY)
+    assert mapper.find_terms("type 2 diabetes") == {"type 2 diabetes", "diabetes"}
+
+
+def test_find_conditions_prefers_longest_match():
+    mapper = make_mapper(TERMINOLOGY)
+    conditions = mapper.find_conditions("Adults with type 2 diabetes")
+    assert [c["term"] for c in conditions] == ["type 2 diabetes"]
+
+    conditions = mapper.find_conditions("Diagnosed T2DM")
+    assert [c["term"] for c in conditions] == ["T2DM"]
+
+
+def test_find_labs_and_medications():
+    mapper = make_mapper(TERMINOLOGY)
+    assert [lab["term"] for lab in mapper.find_lab_tests("Hemoglobin A1c above 7%")] == ["Hemoglobin A1c"]
+    assert [med["term"] for med in mapper.find_medications("Stable on Glucophage")] == ["Glucophage"]
+    assert mapper.find_medications("Healthy volunteers") == []
+
+
+def test_shared_found_terms_give_same_results():
+    mapper = make_mapper(TERMINOLOGY)
+    for text in TEXTS:
+        found = mapper.find_terms(text.lower())
+        assert mapper.find_conditions(text, found) == mapper.find_conditions(text)
+        assert mapper.find_lab_tests(text, found) == mapper.find_lab_tests(text)
+        assert mapper.find_medications(text, found) == mapper.find_medications(text)
+        assert mapper.detect_exclusion(text, found) == mapper.detect_exclusion(text)
+
+
+def test_exclusion_mapping():
+    mapper = make_mapper(TERMINOLOGY)
+    assert mapper.detect_exclusion("No history of diabetic nephropathy")
+    assert not mapper.detect_exclusion("Adults with type 2 diabetes")
+
+    result = mapper.map_criteria_to_codes([
+        "Adults with type 2 diabetes",
+        "No history of diabetic nephropathy",
+    ])
+    assert result["inclusion_codes"]["icd10"] == ["E11.9"]
+    assert result["exclusion_codes"]["icd10"] == ["E11.21"]
+
+
+def test_empty_terminology():
+    mapper = make_mapper({})
+    assert mapper.automaton is None
+    assert mapper.find_terms("type 2 diabetes") == set()
+    assert mapper.find_conditions("type 2 diabetes") == []
+
+
+if __name__ == "__main__":
+    run_checks("Testing Trial Criteria Mapper - Term Lookup", globals())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test Discovery Agent eligibility filtering.
+
+Checks that the vectorized eligible_mask selects exactly the patients the
+original per-patient filter accepted, for:
+1. Age-only criteria
+2. Gender criteria
+3. Condition criteria (exact and partial matches)
+
+Usage:
+    python test_discovery_filters.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from check_runner import run_checks
+from agents.discovery_agent import build_patient_index, eligible_mask
+
+PATIENTS = [
+    {"patient_id": "P001", "age": 17, "gender": "F", "primary_condition": "Type 2 Diabetes"},
+    {"patient_id": "P002", "age": 18, "gender": "M", "primary_condition": "Type 2 Diabetes"},
+    {"patient_id": "P003", "age": 45, "gender": "F", "primary_condition": "Type 1 Diabetes"},
+    {"patient_id": "P004", "age": 65, "gender": "M", "primary_condition": "Hypertension"},
+    {"patient_id": "P005", "age": 66, "gender": "F", "primary_condition": "Hypertension"},
+    {"patient_id": "P006", "age": 99, "gender": "M", "primary_condition": "Asthma"},
+    {"patient_id": "P007", "age": 100, "gender": "F", "primary_condition": "Type 2 Diabetes"},
+    {"patient_id": "P008", "age": 52, "gender": "F", "primary_condition": "Chronic Kidney Disease"},
+    {"patient_id": "P009", "age": 30, "primary_condition": "Asthma"},
+]
+
+CRITERIA = {
+    "age only": {"age_range": {"min": 18, "max": 65}},
+    "default age range": {},
+    "gender": {"age_range": {"min": 18, "max": 99}, "gender": "F"},
+    "unknown gender": {"gender": "X"},
+    "exact condition": {"conditions": ["Hypertension"]},
+    "partial condition": {"conditions": ["diabetes"]},
+    "condition and gender": {"age_range": {"min": 18, "max": 80}, "gender": "M", "conditions": ["Diabetes", "asthma"]},
+    "no matching condition": {"conditions": ["Migraine"]},
+}
+
+
+def baseline_eligible(patients: list, criteria: dict) -> list:
+    """The per-patient filter discover_candidates used before vectorization"""
+    age_min = criteria.get("age_range", {}).get("min", 18)
+    age_max = criteria.get("age_range", {}).get("max", 99)
+    required_gender = criteria.get("gender")
+    required_conditions = criteria.get("conditions", [])
+
+    eligible = []
+    for patient in patients:
+        if not (age_min <= patient.get("age", 0) <= age_max):
+            continue
+
+        if required_gender and patient.get("gender") != required_gender:
+            continue
+
+        patient_condition = patient.get("primary_condition", "")
+        if required_conditions and patient_condition not in required_conditions:
+            if not any(cond.lower() in patient_condition.lower() for cond in required_conditions):
+                continue
+
+        eligible.append(patient["patient_id"])
+    return eligible
+
+
+def vectorized_eligible(patients: list, criteria: dict) -> list:
+    mask = eligible_mask(build_patient_index(patients), criteria)
+    return [patients[i]["patient_id"] for i in mask.nonzero()[0]]
+
+
+def test_eligible_mask_matches_baseline():
+    for name, criteria in CRITERIA.items():
+        expected = baseline_eligible(PATIENTS, criteria)
+        actual = vectorized_eligible(PATIENTS, criteria)
+        assert actual == expected, f"{name}: expected {expected}, got {actual}"
+
+
+def test_eligible_mask_empty_patient_list():
+    assert vectorized_eligible([], {"conditions": ["diabetes"]}) == []
+
+
+if __name__ == "__main__":
+    run_checks("Testing Discovery Agent - Eligibility Filtering", globals())
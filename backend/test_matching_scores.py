@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test Matching Agent scoring.
+
+This script tests:
+1. Vectorized overall scores against the scalar formula
+   (0.4 eligibility + 0.3 similarity + 0.3 enrollment probability, rounded to 3 places)
+2. Ordering by overall score, with ties kept in candidate order
+
+Usage:
+    python test_matching_scores.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from check_runner import run_checks
+from agents.matching_agent import score_candidates
+
+CRITERIA = {
+    "age_range": {"min": 18, "max": 65},
+    "lab_requirements": {"HbA1c": {"min": 6.5, "max": 10.0}}
+}
+
+PATTERNS = [
+    {"pattern_id": "pattern_0", "centroid": [1.0, 0.0, 0.0], "enrollment_success_rate": 0.9},
+    {"pattern_id": "pattern_1", "centroid": [0.0, 2.0, 0.0], "enrollment_success_rate": 0.6},
+    {"pattern_id": "pattern_2", "centroid": [], "enrollment_success_rate": 0.8},
+]
+
+
+def make_candidate(patient_id: str, pattern_id: str, age: int, hba1c=None, embedding=None) -> dict:
+    return {
+        "patient_id": patient_id,
+        "pattern_id": pattern_id,
+        "embedding": embedding or [],
+        "demographics": {"age": age, "gender": "F"},
+        "clinical_data": {
+            "primary_condition": "Type 2 Diabetes",
+            "lab_values": {} if hba1c is None else {"HbA1c": hba1c},
+            "enrollment_history": 0
+        },
+        "location": {"lat": 0.0, "lon": 0.0}
+    }
+
+
+# Ties: P001/P002/P006 and P003/P004 score the same
+CANDIDATES = [
+    make_candidate("P001", "pattern_0", 40, hba1c=7.0),
+    make_candidate("P002", "pattern_0", 50),
+    make_candidate("P003", "pattern_1", 70, hba1c=12.0),
+    make_candidate("P004", "pattern_1", 70, hba1c=12.0),
+    make_candidate("P005", "pattern_0", 30, embedding=[1.0, 1.0, 0.0]),
+    make_candidate("P006", "pattern_0", 35, hba1c="n/a"),
+    make_candidate("P007", "pattern_2", 45),
+    make_candidate("P008", "pattern_9", 17, embedding=[0.0, -1.0, 0.0]),
+    make_candidate("P009", "pattern_1", 60, embedding=[0.0, -3.0, 0.0]),
+]
+
+
+def baseline_scores(candidates: list, criteria: dict, patterns: list) -> list:
+    """The per-candidate scoring loop score_candidates replaced, as (patient_id, overall, ...) rows"""
+    pattern_lookup = {p.get("pattern_id"): p for p in patterns}
+    rows = []
+
+    for candidate in candidates:
+        pattern = pattern_lookup.get(candidate.get("pattern_id"), {})
+        demographics = candidate.get("demographics", {})
+        lab_values = candidate.get("clinical_data", {}).get("lab_values", {})
+
+        eligibility = 1.0
+        age_range = criteria.get("age_range", {})
+        if not (age_range.get("min", 18) <= demographics.get("age", 0) <= age_range.get("max", 99)):
+            eligibility *= 0.5
+        for lab_name, lab_range in criteria.get("lab_requirements", {}).items():
+            value = lab_values.get(lab_name)
+            if isinstance(value, (int, float)):
+                if not (lab_range.get("min", 0) <= value <= lab_range.get("max", 1000)):
+                    eligibility *= 0.8
+        eligibility = max(eligibility, 0.1)
+
+        # Discovery used to send the pattern centroid as the embedding when the
+        # candidate had none of its own
+        embedding = candidate.get("embedding") or pattern.get("centroid", [])
+        centroid = pattern.get("centroid", [])
+        similarity = 0.7
+        if embedding and centroid:
+            a = np.array(embedding[:50], dtype=float)
+            b = np.array(centroid[:50], dtype=float)
+            if np.linalg.norm(a) and np.linalg.norm(b):
+                similarity = (a.dot(b) / (np.linalg.norm(a) * np.linalg.norm(b)) + 1) / 2
+
+        probability = pattern.get("enrollment_success_rate", 0.75)
+        overall = eligibility * 0.4 + similarity * 0.3 + probability * 0.3
+
+        rows.append((
+            candidate["patient_id"],
+            round(overall, 3),
+            round(eligibility, 3),
+            round(similarity, 3),
+            round(probability, 3)
+        ))
+
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows
+
+
+def vectorized_scores(candidates: list, criteria: dict, patterns: list) -> list:
+    return [
+        (m["patient_id"], m["overall_score"], m["eligibility_score"], m["similarity_score"], m["enrollment_probability"])
+        for m in score_candidates(candidates, criteria, patterns)
+    ]
+
+
+def test_scores_match_scalar_formula():
+    expected = baseline_scores(CANDIDATES, CRITERIA, PATTERNS)
+    actual = vectorized_scores(CANDIDATES, CRITERIA, PATTERNS)
+
+    assert [row[0] for row in actual] == [row[0] for row in expected]
+    for exp, act in zip(expected, actual):
+        assert act[1:] == exp[1:], f"{exp[0]}: expected {exp[1:]}, got {act[1:]}"
+        assert all(isinstance(score, float) for score in act[1:])
+
+
+def test_ties_keep_candidate_order():
+    tied = [make_candidate(f"T{i:03d}", "pattern_0", 40) for i in range(5)]
+    matches = score_candidates(tied, CRITERIA, PATTERNS)
+    assert [m["patient_id"] for m in matches] == [c["patient_id"] for c in tied]
+
+
+def test_score_candidates_empty():
+    assert score_candidates([], CRITERIA, PATTERNS) == []
+
+
+if __name__ == "__main__":
+    run_checks("Testing Matching Agent - Candidate Scoring", globals())
@@ -8,9 +8,11 @@ Maps natural language trial eligibility criteria to structured medical codes
 import json
 import re
 import logging
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 from pathlib import Path
 
+import ahocorasick
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +28,7 @@ class TrialCriteriaMapper:
         """
         self.terminology_path = Path(terminology_path)
         self.terminology = self._load_terminology()
+        self.automaton = self._build_automaton()
 
     def _load_terminology(self) -> Dict:
         """Load medical terminology database from JSON"""
@@ -36,7 +39,35 @@ class TrialCriteriaMapper:
             logger.error(f"Failed to load terminology database: {e}")
             return {"conditions": {}, "lab_tests": {}, "medications": {}, "exclusion_keywords": []}
 
-    def detect_exclusion(self, text: str) -> bool:
+    def _build_automaton(self) -> Optional[ahocorasick.Automaton]:
+        """
+        Build one Aho-Corasick automaton over every term the find_* methods look
+        for (condition/lab/medication names and variants, exclusion keywords),
+        so a criterion is scanned once instead of once per term.
+        """
+        terms = set(self.terminology.get("exclusion_keywords", []))
+        for db_name in ("conditions", "lab_tests", "medications"):
+            for name, info in self.terminology.get(db_name, {}).items():
+                terms.add(name)
+                terms.update(variant.lower() for variant in info.get("variants", []))
+        terms.discard("")
+
+        if not terms:
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for term in terms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+        return automaton
+
+    def find_terms(self, text_lower: str) -> Set[str]:
+        """All terminology terms occurring (as substrings) in already-lowercased text"""
+        if self.automaton is None:
+            return set()
+        return {term for _, term in self.automaton.iter(text_lower)}
+
+    def detect_exclusion(self, text: str, found: Optional[Set[str]] = None) -> bool:
         """
         Detect if text contains exclusion/negation keywords.
 
@@ -46,16 +77,13 @@ class TrialCriteriaMapper:
         Returns:
             True if text indicates exclusion/negation
         """
-        text_lower = text.lower()
+        if found is None:
+            found = self.find_terms(text.lower())
         exclusion_keywords = self.terminology.get("exclusion_keywords", [])
 
-        for keyword in exclusion_keywords:
-            if keyword in text_lower:
-                return True
+        return any(keyword in found for keyword in exclusion_keywords)
 
-        return False
-
-    def find_conditions(self, text: str) -> List[Dict]:
+    def find_conditions(self, text: str, found: Optional[Set[str]] = None) -> List[Dict]:
         """
         Find condition mentions in text and map to codes.
 
@@ -66,12 +94,14 @@ class TrialCriteriaMapper:
             List of matched conditions with codes
         """
         text_lower = text.lower()
+        if found is None:
+            found = self.find_terms(text_lower)
         matched_conditions = []
         conditions_db = self.terminology.get("conditions", {})
 
         for condition_name, condition_info in conditions_db.items():
             # Check main name
-            if condition_name in text_lower:
+            if condition_name in found:
                 matched_conditions.append({
                     "term": condition_name,
                     "matched_text": condition_name,
@@ -82,7 +112,7 @@ class TrialCriteriaMapper:
             # Check variants
             variants = condition_info.get("variants", [])
             for variant in variants:
-                if variant.lower() in text_lower:
+                if variant.lower() in found:
                     matched_conditions.append({
                         "term": variant,
                         "matched_text": variant.lower(),
@@ -116,7 +146,7 @@ class TrialCriteriaMapper:
 
         return filtered_conditions
 
-    def find_lab_tests(self, text: str) -> List[Dict]:
+    def find_lab_tests(self, text: str, found: Optional[Set[str]] = None) -> List[Dict]:
         """
         Find lab test mentions in text and map to LOINC codes.
 
@@ -126,13 +156,14 @@ class TrialCriteriaMapper:
         Returns:
             List of matched lab tests with LOINC codes
         """
-        text_lower = text.lower()
+        if found is None:
+            found = self.find_terms(text.lower())
         matched_labs = []
         labs_db = self.terminology.get("lab_tests", {})
 
         for lab_name, lab_info in labs_db.items():
             # Check main name
-            if lab_name in text_lower:
+            if lab_name in found:
                 matched_labs.append({
                     "term": lab_name,
                     **lab_info
@@ -142,7 +173,7 @@ class TrialCriteriaMapper:
             # Check variants
             variants = lab_info.get("variants", [])
             for variant in variants:
-                if variant.lower() in text_lower:
+                if variant.lower() in found:
                     matched_labs.append({
                         "term": variant,
                         **lab_info
@@ -151,7 +182,7 @@ class TrialCriteriaMapper:
 
         return matched_labs
 
-    def find_medications(self, text: str) -> List[Dict]:
+    def find_medications(self, text: str, found: Optional[Set[str]] = None) -> List[Dict]:
         """
         Find medication mentions in text and map to RxNorm codes.
 
@@ -161,13 +192,14 @@ class TrialCriteriaMapper:
         Returns:
             List of matched medications with RxNorm codes
         """
-        text_lower = text.lower()
+        if found is None:
+            found = self.find_terms(text.lower())
         matched_meds = []
         meds_db = self.terminology.get("medications", {})
 
         for med_name, med_info in meds_db.items():
             # Check main name
-            if med_name in text_lower:
+            if med_name in found:
                 matched_meds.append({
                     "term": med_name,
                     **med_info
@@ -177,7 +209,7 @@ class TrialCriteriaMapper:
             # Check variants
             variants = med_info.get("variants", [])
             for variant in variants:
-                if variant.lower() in text_lower:
+                if variant.lower() in found:
                     matched_meds.append({
                         "term": variant,
                         **med_info
@@ -324,10 +356,12 @@ class TrialCriteriaMapper:
 
         # Process each criterion separately to handle exclusions
         for criterion in criteria_list:
-            is_exclusion = self.detect_exclusion(criterion)
+            # One automaton pass per criterion, shared by all the lookups below
+            found = self.find_terms(criterion.lower())
+            is_exclusion = self.detect_exclusion(criterion, found)
 
             # Find conditions
-            conditions = self.find_conditions(criterion)
+            conditions = self.find_conditions(criterion, found)
             for cond in conditions:
                 # Check if this is marked as an exclusion condition
                 is_exclusion_cond = cond.get("exclusion", False)
@@ -352,7 +386,7 @@ class TrialCriteriaMapper:
                 })
 
             # Find lab tests
-            labs = self.find_lab_tests(criterion)
+            labs = self.find_lab_tests(criterion, found)
             for lab in labs:
                 if "loinc" in lab:
                     if is_exclusion:
@@ -367,7 +401,7 @@ class TrialCriteriaMapper:
                 })
 
             # Find medications
-            medications = self.find_medications(criterion)
+            medications = self.find_medications(criterion, found)
             for med in medications:
                 if "rxnorm" in med:
                     if is_exclusion:
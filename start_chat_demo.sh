@@ -28,6 +28,9 @@ if ! command -v npm &> /dev/null; then
     exit 1
 fi
 
+# Agents started from this shell serve chat (the coordinator ignores chat messages otherwise)
+export ENABLE_CHAT_PROTOCOL=1
+
 # Install backend dependencies
 echo "📦 Installing backend dependencies..."
 cd backend
@@ -89,7 +92,8 @@ echo "  Currently running in DEMO mode with simulated responses."
 echo "  To enable real agent communication:"
 echo ""
 echo "    1. Open 8 new terminals"
-echo "    2. Run each agent: python3 backend/agents/<agent>_agent.py"
+echo "    2. Run each agent: ENABLE_CHAT_PROTOCOL=1 python3 backend/agents/<agent>_agent.py"
+echo "       (without ENABLE_CHAT_PROTOCOL=1 the coordinator ignores chat messages)"
 echo "    3. Chat will then use real agent responses"
 echo ""
 echo "======================================================================"